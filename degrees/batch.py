@@ -0,0 +1,102 @@
+"""
+Answer many degrees-of-separation queries in one run.
+
+Reads one query per line from a file (or stdin), each holding a source
+and a target separated by a tab. Either may be a person's name or IMDb id.
+Queries are answered in parallel by a pool of worker processes that
+share the memory-mapped graph snapshot, and results are written to
+stdout as JSON lines in input order.
+"""
+import json
+import multiprocessing
+import sys
+
+import degrees
+
+# Number of queries handed to a worker at a time
+CHUNKSIZE = 16
+
+
+def main():
+    if len(sys.argv) not in [2, 3]:
+        sys.exit("Usage: python batch.py directory [queries]")
+    directory = sys.argv[1]
+
+    # Build the snapshot once up front so every worker can map it
+    degrees.load_data(directory)
+
+    if len(sys.argv) == 3:
+        with open(sys.argv[2], encoding="utf-8") as f:
+            run(directory, f)
+    else:
+        run(directory, sys.stdin)
+
+
+def run(directory, lines):
+    """
+    Answer the queries in `lines`, printing one JSON result per query.
+    """
+    queries = (line.rstrip("\n") for line in lines if line.strip())
+    with multiprocessing.Pool(initializer=init_worker, initargs=(directory,)) as pool:
+        for result in pool.imap(answer, queries, chunksize=CHUNKSIZE):
+            print(json.dumps(result), flush=True)
+
+
+def init_worker(directory):
+    """
+    Load the graph in a worker, unless it was inherited from the parent.
+    """
+    if degrees.graph is None:
+        degrees.load_data(directory)
+
+
+def answer(query):
+    """
+    Returns a JSON-serializable result for one tab-separated query.
+    """
+    fields = query.split("\t")
+    if len(fields) != 2:
+        return {"query": query, "error": "expected source and target separated by a tab"}
+
+    result = {"source": fields[0], "target": fields[1]}
+    source = resolve_person(fields[0])
+    target = resolve_person(fields[1])
+    for key, person in [("source", source), ("target", target)]:
+        if isinstance(person, list):
+            value = result[key]
+            result["error"] = f"{key} is ambiguous" if person else f"{key} not found"
+            result["candidates"] = [
+                candidate._asdict() for candidate in degrees.match_names(value)
+            ]
+            return result
+
+    path = degrees.shortest_path(source, target, mode="bidirectional")
+    result["source_id"] = source
+    result["target_id"] = target
+    if path is None:
+        result["degrees"] = None
+    else:
+        result["degrees"] = len(path)
+        result["path"] = [
+            {"movie_id": movie_id, "person_id": person_id}
+            for movie_id, person_id in path
+        ]
+    return result
+
+
+def resolve_person(value):
+    """
+    Returns the IMDb id for `value`, which is either an id or a name.
+    If the name matches no one or several people, returns the
+    (possibly empty) list of matching ids instead.
+    """
+    if degrees.graph.person_index(value) is not None:
+        return value
+    person_ids = degrees.person_ids_for_name(value)
+    if len(person_ids) == 1:
+        return person_ids[0]
+    return person_ids
+
+
+if __name__ == "__main__":
+    main()
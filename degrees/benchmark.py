@@ -0,0 +1,283 @@
+"""
+Benchmarks for degrees on synthetic IMDb-scale data.
+
+    python benchmark.py generate directory [people]
+    python benchmark.py run directory [report.json]
+
+`generate` writes people.csv, movies.csv and stars.csv with power-law
+cast sizes and a power-law spread of credits across people, so a few
+movies have huge casts and a few people appear in many movies, as in
+the real data. `run` times load_data (cold and from the snapshot) and a
+fixed set of shortest_path queries picked at each distance, recording
+expanded people, wall time and peak memory, and writes a JSON report.
+"""
+import csv
+import json
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+import degrees
+from snapshot import snapshot_path
+from trees import SourceTree
+
+# Defaults for generated data
+PEOPLE = 100000
+MOVIES_PER_PERSON = 0.25
+SEED = 0
+
+# Smallest cast, Pareto shape of cast sizes and of credits per person
+MIN_CAST = 3
+CAST_SHAPE = 1.5
+CREDIT_SHAPE = 1.1
+MAX_CAST = 1000
+
+# Searches compared, sources sampled, and queries per distance bucket
+MODES = ["bipartite", "bidirectional", "arrays", "landmarks"]
+SOURCES = 5
+QUERIES_PER_BUCKET = 3
+MAX_DISTANCE = 8
+
+# Modes that read the CSR arrays directly, so expansions are not counted
+UNCOUNTED_MODES = ["arrays"]
+
+FIRST_NAMES = [
+    "James", "Mary", "John", "Patricia", "Robert", "Jennifer", "Michael",
+    "Linda", "William", "Elizabeth", "David", "Barbara", "Richard", "Susan",
+    "Joseph", "Jessica", "Thomas", "Sarah", "Charles", "Karen", "Emma", "Tom"
+]
+LAST_NAMES = [
+    "Smith", "Johnson", "Williams", "Brown", "Jones", "Garcia", "Miller",
+    "Davis", "Rodriguez", "Martinez", "Hernandez", "Lopez", "Wilson",
+    "Anderson", "Thomas", "Taylor", "Moore", "Jackson", "Martin", "Lee",
+    "Hanks", "Bacon", "Cruise", "Watson"
+]
+
+
+class CountingGraph():
+    """
+    Wraps a graph and counts how many people a search expands, that is
+    how many times it lists a person's movies or co-stars. Searches that
+    index the CSR arrays directly bypass the count.
+    """
+
+    def __init__(self, graph):
+        self.graph = graph
+        self.expanded = 0
+
+    def __getattr__(self, name):
+        return getattr(self.graph, name)
+
+    def movies_of(self, person):
+        self.expanded += 1
+        return self.graph.movies_of(person)
+
+    def neighbors(self, person):
+        self.expanded += 1
+        return self.graph.neighbors(person)
+
+
+def generate(directory, people=PEOPLE, seed=SEED):
+    """
+    Write synthetic people.csv, movies.csv and stars.csv to `directory`.
+    """
+    rng = random.Random(seed)
+    movies = max(1, int(people * MOVIES_PER_PERSON))
+    os.makedirs(directory, exist_ok=True)
+
+    with open(os.path.join(directory, "people.csv"), "w", newline="") as f:
+        writer = csv.writer(f, lineterminator="\n")
+        writer.writerow(["id", "name", "birth"])
+        for i in range(people):
+            name = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+            if rng.random() < 0.5:
+                name = f"{name} {i}"
+            birth = str(rng.randint(1900, 2010)) if rng.random() < 0.6 else ""
+            writer.writerow([str(i + 1), name, birth])
+
+    with open(os.path.join(directory, "movies.csv"), "w", newline="") as f:
+        writer = csv.writer(f, lineterminator="\n")
+        writer.writerow(["id", "title", "year"])
+        for i in range(movies):
+            year = str(rng.randint(1920, 2024))
+            writer.writerow([str(i + 1), f"Movie {i + 1}", year])
+
+    # Each person's chance of being cast follows a power law
+    weights = [rng.paretovariate(CREDIT_SHAPE) for _ in range(people)]
+    cumulative = []
+    total = 0
+    for weight in weights:
+        total += weight
+        cumulative.append(total)
+
+    with open(os.path.join(directory, "stars.csv"), "w", newline="") as f:
+        writer = csv.writer(f, lineterminator="\n")
+        writer.writerow(["person_id", "movie_id"])
+        for movie in range(movies):
+            cast = min(MAX_CAST, int(MIN_CAST * rng.paretovariate(CAST_SHAPE)))
+            stars = set(rng.choices(range(people), cum_weights=cumulative, k=cast))
+            for person in stars:
+                writer.writerow([str(person + 1), str(movie + 1)])
+
+
+def run(directory):
+    """
+    Benchmark loading and searching the data in `directory`.
+    Returns the report as a dict.
+    """
+    report = {"directory": directory}
+
+    # Cold load parses the CSVs, warm load maps the snapshot
+    if os.path.exists(snapshot_path(directory)):
+        os.remove(snapshot_path(directory))
+    start = time.perf_counter()
+    degrees.load_data(directory)
+    cold = time.perf_counter() - start
+    start = time.perf_counter()
+    degrees.load_data(directory)
+    warm = time.perf_counter() - start
+
+    start = time.perf_counter()
+    degrees.prepare_landmarks(directory)
+    landmarks = time.perf_counter() - start
+
+    graph = degrees.graph
+    report["graph"] = {
+        "people": graph.num_people,
+        "movies": graph.num_movies,
+        "stars": len(graph.person_movies),
+        "components": len(degrees.component_sizes())
+    }
+    report["load"] = {
+        "cold_seconds": cold,
+        "warm_seconds": warm,
+        "landmarks_seconds": landmarks,
+        "peak_rss_mb": degrees.peak_rss()
+    }
+
+    report["queries"] = []
+    for distance, source, target in pick_queries(graph):
+        for mode in MODES:
+            result = time_query(graph, source, target, mode)
+            result["distance"] = distance
+            report["queries"].append(result)
+    report["summary"] = summarize(report["queries"])
+    return report
+
+
+def pick_queries(graph):
+    """
+    Returns (distance, source, target) queries over person indices,
+    up to QUERIES_PER_BUCKET at each distance from a few random sources,
+    plus a disconnected pair (distance None) if there is one.
+    """
+    rng = random.Random(SEED)
+    buckets = {}
+    for source in rng.sample(range(graph.num_people), min(SOURCES, graph.num_people)):
+        distances = SourceTree(graph, source).distances
+        people = list(range(graph.num_people))
+        rng.shuffle(people)
+        for target in people:
+            distance = distances[target]
+            key = None if distance < 0 else distance
+            if key is not None and not 1 <= key <= MAX_DISTANCE:
+                continue
+            bucket = buckets.setdefault(key, [])
+            if len(bucket) < QUERIES_PER_BUCKET:
+                bucket.append((key, source, target))
+    queries = []
+    for key in sorted(buckets, key=lambda k: k or 0):
+        queries.extend(buckets[key])
+    return queries
+
+
+def time_query(graph, source, target, mode):
+    """
+    Runs one shortest_path query on person indices, returning its
+    wall time, peak traced memory and number of people expanded.
+    """
+    source_id = graph.person_ids[source]
+    target_id = graph.person_ids[target]
+
+    start = time.perf_counter()
+    path = degrees.shortest_path(source_id, target_id, mode=mode)
+    seconds = time.perf_counter() - start
+
+    # Count expansions and memory in a second run, since tracing
+    # slows the search down
+    counting = CountingGraph(graph)
+    degrees.graph = counting
+    tracemalloc.start()
+    try:
+        degrees.shortest_path(source_id, target_id, mode=mode)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+        degrees.graph = graph
+
+    return {
+        "mode": mode,
+        "source": source_id,
+        "target": target_id,
+        "degrees": None if path is None else len(path),
+        "expanded": None if mode in UNCOUNTED_MODES else counting.expanded,
+        "seconds": seconds,
+        "peak_bytes": peak
+    }
+
+
+def summarize(queries):
+    """
+    Returns the mean time, expansions and peak memory of the queries
+    for each mode and distance.
+    """
+    groups = {}
+    for query in queries:
+        key = (query["mode"], query["distance"])
+        groups.setdefault(key, []).append(query)
+    summary = []
+    for (mode, distance), group in groups.items():
+        expanded = [q["expanded"] for q in group if q["expanded"] is not None]
+        summary.append({
+            "mode": mode,
+            "distance": distance,
+            "queries": len(group),
+            "mean_seconds": sum(q["seconds"] for q in group) / len(group),
+            "mean_expanded": sum(expanded) / len(expanded) if expanded else None,
+            "max_peak_bytes": max(q["peak_bytes"] for q in group)
+        })
+    return summary
+
+
+def main():
+    if len(sys.argv) < 3 or sys.argv[1] not in ["generate", "run"]:
+        sys.exit(
+            "Usage: python benchmark.py generate directory [people]\n"
+            "       python benchmark.py run directory [report.json]"
+        )
+    command, directory = sys.argv[1:3]
+
+    if command == "generate":
+        people = int(sys.argv[3]) if len(sys.argv) > 3 else PEOPLE
+        generate(directory, people)
+        print(f"Generated {people} people in {directory}.")
+        return
+
+    report = run(directory)
+    output = sys.argv[3] if len(sys.argv) > 3 else "benchmark.json"
+    with open(output, "w") as f:
+        json.dump(report, f, indent=4)
+    for row in report["summary"]:
+        expanded = row["mean_expanded"]
+        expanded = "-" if expanded is None else f"{expanded:.0f}"
+        print(
+            f"{row['mode']:>13} distance {str(row['distance']):>4}: "
+            f"{row['mean_seconds'] * 1000:9.2f} ms, {expanded:>9} expanded"
+        )
+    print(f"Report written to {output}.")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,55 +1,168 @@
 import csv
+import os
+import resource
 import sys
 
+from graph import load_graph
+from landmarks import build_landmarks, landmark_search, load_landmarks, write_landmarks
+from nameindex import NameIndex
+from parallel import load_graph_parallel
+from search import array_search, bidirectional_search, bipartite_search
+from snapshot import load_snapshot, write_snapshot
+from trees import TreeCache
 from util import Node, StackFrontier, QueueFrontier
 
-# Maps names to a set of corresponding person_ids
-names = {}
+# Total CSV size, in bytes, above which they are parsed in parallel
+PARALLEL_THRESHOLD = 32 * 2 ** 20
 
-# Maps person_ids to a dictionary of: name, birth, movies (a set of movie_ids)
-people = {}
+# Graphs with fewer people than this use the Node search for "arrays" mode
+ARRAY_SEARCH_THRESHOLD = 10000
 
-# Maps movie_ids to a dictionary of: title, year, stars (a set of person_ids)
-movies = {}
+# Compact people/movies graph, see graph.Graph
+graph = None
+
+# Landmark distance oracle, see landmarks.Landmarks
+oracle = None
+
+# Prefix and fuzzy name lookups, see nameindex.NameIndex
+name_index = None
+
+# Recently used single-source search trees, see trees.TreeCache
+trees = None
 
 
 def load_data(directory):
     """
     Load data from CSV files into memory.
+
+    The parsed graph is cached in a snapshot file next to the CSVs, which
+    later runs load directly until the CSVs change. Large CSVs are
+    parsed across a pool of processes when there is more than one core.
+    """
+    global graph, oracle, name_index, trees
+    oracle = None
+    name_index = None
+    graph = load_snapshot(directory)
+    if graph is None:
+        size = sum(
+            os.path.getsize(os.path.join(directory, filename))
+            for filename in ["people.csv", "movies.csv", "stars.csv"]
+        )
+        if size > PARALLEL_THRESHOLD and (os.cpu_count() or 1) > 1:
+            graph = load_graph_parallel(directory)
+        else:
+            graph = load_graph(directory)
+        try:
+            write_snapshot(graph, directory)
+        except OSError:
+            pass
+    trees = TreeCache(graph)
+
+
+def append_data(directory, people=(), movies=(), stars=()):
+    """
+    Add rows to the loaded graph and to the CSVs and snapshot in
+    `directory`, without reloading.
+
+    `people` holds (id, name, birth) rows, `movies` (id, title, year)
+    rows and `stars` (person_id, movie_id) rows. Rows for ids that
+    already exist, stars already in the graph, and stars for unknown
+    people or movies are skipped.
+    Returns the number of people, movies and stars added.
+    """
+    global oracle, trees
+    graph.make_writable()
+
+    new_people = []
+    for person_id, name, birth in people:
+        person = graph.add_person(person_id, name, birth)
+        if person is not None:
+            new_people.append(person)
+            if name_index is not None:
+                name_index.add(person)
+
+    new_movies = []
+    for movie_id, title, year in movies:
+        if graph.add_movie(movie_id, title, year) is not None:
+            new_movies.append((movie_id, title, year))
+
+    # Credits already in the graph, or repeated in `stars`, are skipped
+    new_stars = []
+    seen = set()
+    for person_id, movie_id in stars:
+        person = graph.person_index(person_id)
+        movie = graph.movie_index(movie_id)
+        if person is None or movie is None or (person, movie) in seen:
+            continue
+        if movie in graph.movies_of(person):
+            continue
+        seen.add((person, movie))
+        new_stars.append((person, movie))
+    graph.add_stars(new_stars)
+
+    # Keep the CSVs and snapshot in step with the graph
+    append_rows(os.path.join(directory, "people.csv"), [
+        (graph.person_ids[p], graph.person_names[p], graph.person_births[p])
+        for p in new_people
+    ])
+    append_rows(os.path.join(directory, "movies.csv"), new_movies)
+    append_rows(os.path.join(directory, "stars.csv"), [
+        (graph.person_ids[p], graph.movie_ids[m]) for p, m in new_stars
+    ])
+    write_snapshot(graph, directory)
+
+    # Landmark distances and search trees are out of date
+    oracle = None
+    trees = TreeCache(graph)
+    return len(new_people), len(new_movies), len(new_stars)
+
+
+def append_rows(path, rows):
+    """
+    Append `rows` to the CSV file at `path`.
+    """
+    if not rows:
+        return
+    with open(path, "rb+") as f:
+        f.seek(0, os.SEEK_END)
+        if f.tell() > 0:
+            f.seek(-1, os.SEEK_END)
+            ends_with_newline = f.read(1) == b"\n"
+        else:
+            ends_with_newline = True
+    with open(path, "a", encoding="utf-8", newline="") as f:
+        if not ends_with_newline:
+            f.write("\n")
+        writer = csv.writer(f, lineterminator="\n")
+        writer.writerows(rows)
+
+
+def prepare_landmarks(directory):
+    """
+    Load the landmark distance oracle for the loaded graph, building
+    and caching it next to the CSVs in `directory` on first use.
+    """
+    global oracle
+    oracle = load_landmarks(directory)
+    if oracle is not None:
+        return
+
+    oracle = build_landmarks(graph)
+    try:
+        write_landmarks(oracle, directory)
+    except OSError:
+        pass
+
+
+def peak_rss():
+    """
+    Returns the peak resident set size of this process in megabytes.
     """
-    # Load people
-    with open(f"{directory}/people.csv", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            people[row["id"]] = {
-                "name": row["name"],
-                "birth": row["birth"],
-                "movies": set()
-            }
-            if row["name"].lower() not in names:
-                names[row["name"].lower()] = {row["id"]}
-            else:
-                names[row["name"].lower()].add(row["id"])
-
-    # Load movies
-    with open(f"{directory}/movies.csv", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            movies[row["id"]] = {
-                "title": row["title"],
-                "year": row["year"],
-                "stars": set()
-            }
-
-    # Load stars
-    with open(f"{directory}/stars.csv", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            try:
-                people[row["person_id"]]["movies"].add(row["movie_id"])
-                movies[row["movie_id"]]["stars"].add(row["person_id"])
-            except KeyError:
-                pass
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Reported in bytes on macOS and in kilobytes elsewhere
+    if sys.platform == "darwin":
+        return peak / 2 ** 20
+    return peak / 2 ** 10
 
 
 def main():
@@ -58,9 +171,9 @@ def main():
     directory = sys.argv[1] if len(sys.argv) == 2 else "large"
 
     # Load data from files into memory
-    print("Loading data...")
+    print(f"Loading data... (peak memory {peak_rss():.1f} MB)")
     load_data(directory)
-    print("Data loaded.")
+    print(f"Data loaded. (peak memory {peak_rss():.1f} MB)")
 
     source = person_id_for_name(input("Name: "))
     if source is None:
@@ -79,9 +192,9 @@ def main():
         print(f"{degrees} degrees of separation.")
         path = [(None, source)] + path
         for i in range(degrees):
-            person1 = people[path[i][1]]["name"]
-            person2 = people[path[i + 1][1]]["name"]
-            movie = movies[path[i + 1][0]]["title"]
+            person1 = graph.person_names[graph.person_index(path[i][1])]
+            person2 = graph.person_names[graph.person_index(path[i + 1][1])]
+            movie = graph.movie_titles[graph.movie_index(path[i + 1][0])]
             print(f"{i + 1}: {person1} and {person2} starred in {movie}")
 
 
@@ -90,13 +203,110 @@ def main():
 
 
 
-def shortest_path(source, target):
+def shortest_path(source, target, mode="bipartite"):
     """
     Returns the shortest list of (movie_id, person_id) pairs
     that connect the source to the target.
 
+    `mode` selects the search: "bipartite" searches outwards from the
+    source visiting each movie once, "bfs" searches outwards person by
+    person, "bidirectional" grows frontiers from both ends, and
+    "landmarks" runs A* guided by the landmark oracle
+    (see prepare_landmarks).
+
     If no possible path, returns None.
     """
+    source = graph.person_index(source)
+    target = graph.person_index(target)
+
+    # People in different components are never connected
+    if not graph.connected(source, target):
+        return None
+
+    if mode == "bipartite":
+        path = bipartite_search(graph, source, target)
+    elif mode == "bfs":
+        path = breadth_first_search(source, target)
+    elif mode == "bidirectional":
+        path = bidirectional_search(graph, source, target)
+    elif mode == "arrays":
+        if graph.num_people < ARRAY_SEARCH_THRESHOLD:
+            path = breadth_first_search(source, target)
+        else:
+            path = array_search(graph, source, target)
+    elif mode == "tree":
+        path = trees.tree(source).path(target)
+    elif mode == "landmarks":
+        if oracle is None:
+            raise Exception("landmarks not prepared")
+        path = landmark_search(graph, oracle, source, target)
+    else:
+        raise Exception(f"unknown search mode {mode!r}")
+
+    if path is None:
+        return None
+    return [(graph.movie_ids[m], graph.person_ids[p]) for m, p in path]
+
+
+def component_sizes():
+    """
+    Returns the sizes of the graph's connected components,
+    largest first.
+    """
+    return sorted((size for size in graph.component_sizes if size > 0), reverse=True)
+
+
+def distance_histogram(source):
+    """
+    Returns a dict mapping each degree of separation from `source` to
+    the number of people that far away, with unreachable people counted
+    under None. Uses the cached search tree for `source`.
+    """
+    return trees.tree(graph.person_index(source)).histogram()
+
+
+def estimate_degrees(source, target):
+    """
+    Returns a (lower, upper) pair of bounds on the degrees of separation
+    between two people, using the landmark oracle. `upper` is None if
+    unknown, and both are None if the people are not connected.
+    """
+    if oracle is None:
+        raise Exception("landmarks not prepared")
+    return oracle.bounds(graph.person_index(source), graph.person_index(target))
+
+
+def at_most_degrees(source, target, k):
+    """
+    Returns True if two people are known to be at most `k` degrees apart,
+    False if they are known to be further apart, or None if unknown.
+    """
+    if oracle is None:
+        raise Exception("landmarks not prepared")
+    return oracle.at_most(graph.person_index(source), graph.person_index(target), k)
+
+
+def at_least_degrees(source, target, k):
+    """
+    Returns True if two people are known to be at least `k` degrees apart,
+    False if they are known to be closer, or None if unknown.
+    """
+    if oracle is None:
+        raise Exception("landmarks not prepared")
+    return oracle.at_least(graph.person_index(source), graph.person_index(target), k)
+
+
+def breadth_first_search(source, target):
+    """
+    Returns the shortest list of (movie, person) index pairs
+    that connect the source index to the target index.
+
+    If no possible path, returns None.
+    """
+
+    # Source is the goal, no movies needed
+    if source == target:
+        return []
 
     start = Node(state=source, parent=None, action=None) #initial state/source
     frontier = QueueFrontier()
@@ -115,40 +325,32 @@ def shortest_path(source, target):
         node = frontier.remove()
         explored.add(node.state)
 
-
-        # Inspect if node is the goal, then we have a solution
-        if node.state == target:
-            movies = []
-            people = []
-
-            while node.parent is not None:
-                movies.append(node.action)
-                people.append(node.state)
-                node = node.parent
-
-            movies.reverse()
-            people.reverse()
-
-            spath = list(zip(movies, people))
-            #print(spath)
-
-            return spath
-
-
-        # Add neighbors to frontier
-
-        for (movie_id,person_id) in neighbors_for_person(node.state):
-            if person_id not in explored: #not frontier.contains_state(person_id) and #optimised
-                child = Node(state=person_id, parent=node, action=movie_id)
+        # Add neighbors to frontier, checking for the goal as each is generated
+        for (movie,person) in graph.neighbors(node.state):
+            if person not in explored and not frontier.contains_state(person):
+                child = Node(state=person, parent=node, action=movie)
+                if person == target:
+                    return node_path(child)
                 frontier.add(child)
 
 
+def node_path(node):
+    """
+    Returns the list of (movie, person) pairs leading to `node`
+    by following its parent chain back to the start.
+    """
+    movies = []
+    people = []
 
+    while node.parent is not None:
+        movies.append(node.action)
+        people.append(node.state)
+        node = node.parent
 
+    movies.reverse()
+    people.reverse()
 
-
-
-
+    return list(zip(movies, people))
 
 
 def person_id_for_name(name):
@@ -156,15 +358,15 @@ def person_id_for_name(name):
     Returns the IMDB id for a person's name,
     resolving ambiguities as needed.
     """
-    person_ids = list(names.get(name.lower(), set()))
+    person_ids = person_ids_for_name(name)
     if len(person_ids) == 0:
         return None
     elif len(person_ids) > 1:
         print(f"Which '{name}'?")
         for person_id in person_ids:
-            person = people[person_id]
-            name = person["name"]
-            birth = person["birth"]
+            person = graph.person_index(person_id)
+            name = graph.person_names[person]
+            birth = graph.person_births[person]
             print(f"ID: {person_id}, Name: {name}, Birth: {birth}")
         try:
             person_id = input("Intended Person ID: ")
@@ -177,17 +379,34 @@ def person_id_for_name(name):
         return person_ids[0]
 
 
+def person_ids_for_name(name):
+    """
+    Returns the IMDB ids of every person with a given name,
+    without prompting.
+    """
+    return [graph.person_ids[i] for i in graph.people_named(name)]
+
+
+def match_names(query, limit=10):
+    """
+    Returns up to `limit` ranked nameindex.Candidates for `query`,
+    matching exactly, by prefix, or within a few typos. Never prompts.
+    """
+    global name_index
+    if name_index is None:
+        name_index = NameIndex(graph)
+    return name_index.search(query, limit)
+
+
 #ACTIONS(s)
 def neighbors_for_person(person_id):
     """
     Returns (movie_id, person_id) pairs for people
     who starred with a given person.
     """
-    movie_ids = people[person_id]["movies"]
     neighbors = set()
-    for movie_id in movie_ids:
-        for person_id in movies[movie_id]["stars"]:
-            neighbors.add((movie_id, person_id))
+    for movie, person in graph.neighbors(graph.person_index(person_id)):
+        neighbors.add((graph.movie_ids[movie], graph.person_ids[person]))
     return neighbors
 
 
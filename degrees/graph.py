@@ -0,0 +1,488 @@
+import csv
+from array import array
+from bisect import bisect_left, bisect_right
+
+
+class Graph():
+    """
+    Compact representation of the people/movies star graph.
+
+    Every person and movie is mapped to a dense integer index. The star
+    relation is bipartite and is stored twice in CSR form:
+        - `person_offsets` / `person_movies`: the movies of each person
+        - `movie_offsets` / `movie_stars`: the stars of each movie
+    The movies of person `p` are
+    `person_movies[person_offsets[p]:person_offsets[p + 1]]`.
+    """
+
+    def __init__(self):
+        # Per-person string columns, indexed by person index
+        self.person_ids = StringTable()
+        self.person_names = StringTable()
+        self.person_births = StringTable()
+
+        # Per-movie string columns, indexed by movie index
+        self.movie_ids = StringTable()
+        self.movie_titles = StringTable()
+        self.movie_years = StringTable()
+
+        # CSR adjacency in both directions
+        self.person_offsets = array("q", [0])
+        self.person_movies = array("i")
+        self.movie_offsets = array("q", [0])
+        self.movie_stars = array("i")
+
+        # Connected component label of each person, and size of each component
+        self.components = array("i")
+        self.component_sizes = array("q")
+
+        # Lookups from IMDb ids and lowercase names to indices
+        self.person_lookup = SortedIndex(self.person_ids, array("i"))
+        self.movie_lookup = SortedIndex(self.movie_ids, array("i"))
+        self.name_lookup = SortedIndex(
+            self.person_names, array("i"), key=str.lower, unique=False
+        )
+
+    @property
+    def num_people(self):
+        return len(self.person_ids)
+
+    @property
+    def num_movies(self):
+        return len(self.movie_ids)
+
+    def person_index(self, person_id):
+        """
+        Returns the index of the person with IMDb id `person_id`,
+        or None if there is no such person.
+        """
+        return self.person_lookup.get(person_id)
+
+    def movie_index(self, movie_id):
+        """
+        Returns the index of the movie with IMDb id `movie_id`,
+        or None if there is no such movie.
+        """
+        return self.movie_lookup.get(movie_id)
+
+    def people_named(self, name):
+        """
+        Returns the indices of all people called `name` (case-insensitive).
+        """
+        return self.name_lookup.get(name.lower(), ())
+
+    def movies_of(self, person):
+        """
+        Returns the indices of the movies person `person` starred in.
+        """
+        return self.person_movies[
+            self.person_offsets[person]:self.person_offsets[person + 1]
+        ]
+
+    def stars_of(self, movie):
+        """
+        Returns the indices of the people who starred in movie `movie`.
+        """
+        return self.movie_stars[
+            self.movie_offsets[movie]:self.movie_offsets[movie + 1]
+        ]
+
+    def connected(self, source, target):
+        """
+        Returns True if there is a path between two person indices.
+        """
+        return self.components[source] == self.components[target]
+
+    def component_size(self, person):
+        """
+        Returns the number of people in the component of person `person`.
+        """
+        return self.component_sizes[self.components[person]]
+
+    def neighbors(self, person):
+        """
+        Yields (movie, person) index pairs for people who starred
+        with person `person`, including `person` itself.
+        """
+        person_offsets = self.person_offsets
+        person_movies = self.person_movies
+        movie_offsets = self.movie_offsets
+        movie_stars = self.movie_stars
+        for i in range(person_offsets[person], person_offsets[person + 1]):
+            movie = person_movies[i]
+            for j in range(movie_offsets[movie], movie_offsets[movie + 1]):
+                yield movie, movie_stars[j]
+
+    def make_writable(self):
+        """
+        Copies any memory-mapped arrays (see snapshot.py) into ordinary
+        arrays, so that the graph can be updated in place.
+        """
+        for name in [
+            "person_offsets", "person_movies", "movie_offsets", "movie_stars",
+            "components", "component_sizes"
+        ]:
+            setattr(self, name, writable(getattr(self, name)))
+        for table in [
+            self.person_ids, self.person_names, self.person_births,
+            self.movie_ids, self.movie_titles, self.movie_years
+        ]:
+            table.offsets = writable(table.offsets)
+            table.data = writable(table.data)
+        for lookup in [self.person_lookup, self.movie_lookup, self.name_lookup]:
+            lookup.order = writable(lookup.order)
+
+    def add_person(self, person_id, name, birth):
+        """
+        Adds a person with no movies in a component of their own.
+
+        Returns the new person's index, or None if `person_id` is taken.
+        """
+        if self.person_index(person_id) is not None:
+            return None
+        person = self.num_people
+        self.person_ids.append(person_id)
+        self.person_names.append(name)
+        self.person_births.append(birth)
+        self.person_offsets.append(self.person_offsets[-1])
+        self.person_lookup.insert(person)
+        self.name_lookup.insert(person)
+        self.components.append(len(self.component_sizes))
+        self.component_sizes.append(1)
+        return person
+
+    def add_movie(self, movie_id, title, year):
+        """
+        Adds a movie with no stars.
+
+        Returns the new movie's index, or None if `movie_id` is taken.
+        """
+        if self.movie_index(movie_id) is not None:
+            return None
+        movie = self.num_movies
+        self.movie_ids.append(movie_id)
+        self.movie_titles.append(title)
+        self.movie_years.append(year)
+        self.movie_offsets.append(self.movie_offsets[-1])
+        self.movie_lookup.insert(movie)
+        return movie
+
+    def add_stars(self, stars):
+        """
+        Adds (person, movie) index pairs to the star relation, merging
+        the connected components they join.
+        """
+        person_additions = {}
+        movie_additions = {}
+        for person, movie in stars:
+            person_additions.setdefault(person, []).append(movie)
+            movie_additions.setdefault(movie, []).append(person)
+
+        self.person_offsets, self.person_movies = insert_csr(
+            self.person_offsets, self.person_movies, person_additions
+        )
+        self.movie_offsets, self.movie_stars = insert_csr(
+            self.movie_offsets, self.movie_stars, movie_additions
+        )
+        for movie in movie_additions:
+            self.merge_components(self.stars_of(movie))
+
+    def merge_components(self, people):
+        """
+        Gives every person in the components of `people` one label.
+
+        The largest component keeps its label and the others are
+        relabelled by a search that stays inside each of them.
+        """
+        labels = {self.components[person] for person in people}
+        if len(labels) < 2:
+            return
+        keep = max(labels, key=lambda label: self.component_sizes[label])
+        for label in labels - {keep}:
+            start = next(p for p in people if self.components[p] == label)
+            self.components[start] = keep
+            frontier = [start]
+            while frontier:
+                person = frontier.pop()
+                for movie in self.movies_of(person):
+                    for star in self.stars_of(movie):
+                        if self.components[star] == label:
+                            self.components[star] = keep
+                            frontier.append(star)
+            self.component_sizes[keep] += self.component_sizes[label]
+            self.component_sizes[label] = 0
+
+
+class StringTable():
+    """
+    Sequence of strings stored as one UTF-8 buffer and an array of
+    offsets into it, which takes a fraction of the memory of a list of
+    str objects. Tables backed by arrays can be appended to; tables
+    backed by memoryviews (see snapshot.py) are read-only.
+    """
+
+    def __init__(self, offsets=None, data=None):
+        self.offsets = array("q", [0]) if offsets is None else offsets
+        self.data = array("B") if data is None else data
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += len(self)
+        if i < 0 or i >= len(self):
+            raise IndexError("string table index out of range")
+        return str(self.data[self.offsets[i]:self.offsets[i + 1]], "utf-8")
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def append(self, string):
+        self.data.frombytes(string.encode("utf-8"))
+        self.offsets.append(len(self.data))
+
+    def extend(self, other):
+        """
+        Appends every string of another StringTable.
+        """
+        base = len(self.data)
+        self.data.extend(other.data)
+        self.offsets.extend(offset + base for offset in other.offsets[1:])
+
+
+class SortedIndex():
+    """
+    Lookup from keys to indices, backed by a permutation `order` that
+    sorts the strings of `table` by `key`. Lookups are binary searches.
+    """
+
+    def __init__(self, table, order, key=None, unique=True):
+        self.table = table
+        self.order = order
+        self.key = key
+        self.unique = unique
+
+    def __len__(self):
+        return len(self.order)
+
+    def __getitem__(self, i):
+        value = self.table[self.order[i]]
+        return value if self.key is None else self.key(value)
+
+    def insert(self, index):
+        """
+        Adds the string at `index` of the table to the sort order.
+        """
+        value = self.table[index]
+        key = value if self.key is None else self.key(value)
+        self.order.insert(bisect_right(self, key), index)
+
+    def get(self, key, default=None):
+        """
+        Returns the index for `key` if the index is unique, otherwise
+        the list of indices for `key`. Returns `default` if not found.
+        """
+        start = bisect_left(self, key)
+        end = bisect_right(self, key, lo=start)
+        if start == end:
+            return default
+        if self.unique:
+            return self.order[start]
+        return [self.order[i] for i in range(start, end)]
+
+
+def sort_order(strings, key=None):
+    """
+    Returns an array of the indices of `strings` in sorted order.
+    """
+    if key is None:
+        return array("i", sorted(range(len(strings)), key=strings.__getitem__))
+    return array("i", sorted(range(len(strings)), key=lambda i: key(strings[i])))
+
+
+def writable(values):
+    """
+    Returns `values` as an array, copying it if it is a memoryview.
+    """
+    if isinstance(values, array):
+        return values
+    copy = array(values.format)
+    copy.frombytes(values.cast("B"))
+    return copy
+
+
+def insert_csr(offsets, indices, additions):
+    """
+    Returns new (offsets, indices) CSR arrays with the values in
+    `additions`, a dict from row to a list of values, merged into their
+    rows. Rows stay sorted and free of repeats, and unchanged runs of
+    rows are copied across in slices.
+    """
+    merged = array(indices.typecode)
+    shifted = array("q")
+    shift = 0
+    previous = 0
+    for row in sorted(additions):
+        start = offsets[row]
+        end = offsets[row + 1]
+        merged.extend(indices[offsets[previous]:start])
+        shifted.extend(offset + shift for offset in offsets[previous:row + 1])
+        values = sorted(set(indices[start:end]).union(additions[row]))
+        merged.extend(values)
+        shift += len(values) - (end - start)
+        previous = row + 1
+    merged.extend(indices[offsets[previous]:])
+    shifted.extend(offset + shift for offset in offsets[previous:])
+    return shifted, merged
+
+
+def build_csr(size, keys, values):
+    """
+    Groups `values` by `keys` (both integer arrays of equal length) into
+    CSR form for `size` rows using a counting sort. Each row is sorted
+    and repeated values are removed.
+
+    Returns an (offsets, indices) pair of arrays.
+    """
+    offsets = array("q", bytes(8 * (size + 1)))
+    for key in keys:
+        offsets[key + 1] += 1
+    for i in range(size):
+        offsets[i + 1] += offsets[i]
+
+    indices = array("i", bytes(4 * len(values)))
+    cursor = array("q", offsets[:-1])
+    for key, value in zip(keys, values):
+        indices[cursor[key]] = value
+        cursor[key] += 1
+
+    # Sort each row and drop repeated values
+    unique = array("i")
+    start = 0
+    for i in range(size):
+        end = offsets[i + 1]
+        unique.extend(sorted(set(indices[start:end])))
+        start = end
+        offsets[i + 1] = len(unique)
+    return offsets, unique
+
+
+def label_components(graph):
+    """
+    Labels the connected components of `graph` by breadth-first search.
+
+    Returns a (components, sizes) pair of arrays: the component label
+    of each person, and the number of people with each label.
+    """
+    components = array("i", [-1]) * graph.num_people
+    sizes = array("q")
+    seen_movies = bytearray(graph.num_movies)
+    for start in range(graph.num_people):
+        if components[start] != -1:
+            continue
+        label = len(sizes)
+        components[start] = label
+        size = 1
+        frontier = [start]
+        while frontier:
+            person = frontier.pop()
+            for movie in graph.movies_of(person):
+                if seen_movies[movie]:
+                    continue
+                seen_movies[movie] = 1
+                for star in graph.stars_of(movie):
+                    if components[star] == -1:
+                        components[star] = label
+                        size += 1
+                        frontier.append(star)
+        sizes.append(size)
+    return components, sizes
+
+
+def load_graph(directory):
+    """
+    Load people.csv, movies.csv and stars.csv from `directory`
+    into a new Graph.
+
+    Rows are streamed straight into the graph's string tables and
+    index arrays, so no per-person or per-movie objects are created.
+    Star rows that reference unknown people or movies are dropped.
+    """
+    graph = Graph()
+
+    # Load people, keeping a temporary map from IMDb id to index
+    people = {}
+    rows = read_rows(directory, "people.csv", ["id", "name", "birth"])
+    for person_id, name, birth in rows:
+        if person_id in people:
+            continue
+        people[person_id] = len(people)
+        graph.person_ids.append(person_id)
+        graph.person_names.append(name)
+        graph.person_births.append(birth)
+
+    # Load movies
+    movies = {}
+    rows = read_rows(directory, "movies.csv", ["id", "title", "year"])
+    for movie_id, title, year in rows:
+        if movie_id in movies:
+            continue
+        movies[movie_id] = len(movies)
+        graph.movie_ids.append(movie_id)
+        graph.movie_titles.append(title)
+        graph.movie_years.append(year)
+
+    # Load stars, skipping unknown people or movies
+    star_people = array("i")
+    star_movies = array("i")
+    rows = read_rows(directory, "stars.csv", ["person_id", "movie_id"])
+    for person_id, movie_id in rows:
+        person = people.get(person_id)
+        movie = movies.get(movie_id)
+        if person is not None and movie is not None:
+            star_people.append(person)
+            star_movies.append(movie)
+
+    finish_graph(graph, people, movies, star_people, star_movies)
+    return graph
+
+
+def finish_graph(graph, people, movies, star_people, star_movies):
+    """
+    Completes a graph whose string columns are loaded: builds the
+    lookups from the `people` and `movies` id -> index maps, the CSR
+    arrays from the parallel `star_people` and `star_movies` arrays,
+    and the component labels. The maps and arrays are emptied as they
+    are used up, to keep peak memory down.
+    """
+    # Replace the temporary maps with binary search lookups
+    graph.person_lookup.order = array("i", (i for _, i in sorted(people.items())))
+    graph.movie_lookup.order = array("i", (i for _, i in sorted(movies.items())))
+    people.clear()
+    movies.clear()
+    graph.name_lookup.order = sort_order(graph.person_names, key=str.lower)
+
+    graph.person_offsets, graph.person_movies = build_csr(
+        graph.num_people, star_people, star_movies
+    )
+    graph.movie_offsets, graph.movie_stars = build_csr(
+        graph.num_movies, star_movies, star_people
+    )
+    del star_people[:], star_movies[:]
+    graph.components, graph.component_sizes = label_components(graph)
+
+
+def read_rows(directory, filename, columns):
+    """
+    Yields the values of `columns` from each row of a CSV file,
+    one row at a time.
+    """
+    with open(f"{directory}/{filename}", encoding="utf-8", newline="") as f:
+        reader = csv.reader(f)
+        header = next(reader, [])
+        positions = [header.index(column) for column in columns]
+        for row in reader:
+            if row:
+                yield [row[i] for i in positions]
@@ -0,0 +1,270 @@
+"""
+Landmark (ALT) distance oracle over a graph.Graph.
+
+A handful of well-connected people are chosen as landmarks and their
+degrees of separation to every other person are precomputed. By the
+triangle inequality, for any landmark L
+
+    |d(L, p) - d(L, q)| <= d(p, q) <= d(L, p) + d(L, q)
+
+which gives instant lower and upper bounds on the degrees between two
+people, and an admissible heuristic for A* search.
+"""
+import heapq
+import os
+from array import array
+from operator import sub
+
+from search import parent_path
+from snapshot import read_sections, source_stats, write_sections
+
+LANDMARKS_FILE = "landmarks.snapshot"
+
+# Number of landmarks to select
+LANDMARKS = 16
+
+# Distance stored for people a landmark cannot reach
+UNREACHABLE = -1
+
+
+class Landmarks():
+    """
+    Precomputed distances from each landmark to every person.
+    """
+
+    def __init__(self, people, distances):
+        # Person index of each landmark, and its distance array
+        self.people = people
+        self.distances = distances
+        # Profile number of each person, and the distinct profiles,
+        # built on first use by profiles
+        self.profile_of = None
+        self.profile_list = None
+
+    def bounds(self, source, target):
+        """
+        Returns a (lower, upper) pair of bounds on the degrees of
+        separation between two person indices. `upper` is None if no
+        landmark reaches both, and both are None if the two people are
+        known not to be connected.
+        """
+        lower = 0
+        upper = None
+        for distances in self.distances:
+            d1 = distances[source]
+            d2 = distances[target]
+            if d1 == UNREACHABLE and d2 == UNREACHABLE:
+                continue
+            if d1 == UNREACHABLE or d2 == UNREACHABLE:
+                return None, None
+            lower = max(lower, abs(d1 - d2))
+            if upper is None or d1 + d2 < upper:
+                upper = d1 + d2
+        return lower, upper
+
+    def lower_bound(self, source, target):
+        """
+        Returns a lower bound on the degrees of separation between two
+        person indices, or None if they are known not to be connected.
+        """
+        lower = 0
+        for distances in self.distances:
+            d1 = distances[source]
+            d2 = distances[target]
+            if d1 == UNREACHABLE and d2 == UNREACHABLE:
+                continue
+            if d1 == UNREACHABLE or d2 == UNREACHABLE:
+                return None
+            if abs(d1 - d2) > lower:
+                lower = abs(d1 - d2)
+        return lower
+
+    def profiles(self):
+        """
+        Returns an array mapping each person index to a profile number,
+        and the list of profiles: the distinct tuples of distances from
+        every landmark. People with the same profile get the same bounds
+        to any target, and there are far fewer profiles than people.
+        """
+        if self.profile_of is None:
+            numbers = {}
+            self.profile_of = array("i", (
+                numbers.setdefault(profile, len(numbers))
+                for profile in zip(*self.distances)
+            ))
+            self.profile_list = list(numbers)
+        return self.profile_of, self.profile_list
+
+    def at_most(self, source, target, k):
+        """
+        Returns True if the two people are known to be at most `k` degrees
+        apart, False if they are known to be further apart, and None if
+        the landmarks cannot tell.
+        """
+        lower, upper = self.bounds(source, target)
+        if lower is None or lower > k:
+            return False
+        if upper is not None and upper <= k:
+            return True
+        return None
+
+    def at_least(self, source, target, k):
+        """
+        Returns True if the two people are known to be at least `k` degrees
+        apart (or not connected), False if they are known to be closer,
+        and None if the landmarks cannot tell.
+        """
+        lower, upper = self.bounds(source, target)
+        if lower is None or lower >= k:
+            return True
+        if upper is not None and upper < k:
+            return False
+        return None
+
+
+def select_landmarks(graph, count=LANDMARKS):
+    """
+    Returns the indices of the `count` people with the most co-stars,
+    counting a co-star once per shared movie.
+    """
+    def costars(person):
+        return sum(len(graph.stars_of(movie)) for movie in graph.movies_of(person))
+
+    return heapq.nlargest(count, range(graph.num_people), key=costars)
+
+
+def person_distances(graph, source):
+    """
+    Returns an array of the degrees of separation from `source` to every
+    person, with UNREACHABLE for people in other components.
+    """
+    distances = array("h", [UNREACHABLE]) * graph.num_people
+    seen_movies = bytearray(graph.num_movies)
+    distances[source] = 0
+    frontier = [source]
+    depth = 0
+    while frontier:
+        depth += 1
+        layer = []
+        for person in frontier:
+            for movie in graph.movies_of(person):
+                if seen_movies[movie]:
+                    continue
+                seen_movies[movie] = 1
+                for star in graph.stars_of(movie):
+                    if distances[star] == UNREACHABLE:
+                        distances[star] = depth
+                        layer.append(star)
+        frontier = layer
+    return distances
+
+
+def build_landmarks(graph, count=LANDMARKS):
+    """
+    Select landmarks and compute their distance arrays.
+    """
+    people = select_landmarks(graph, count)
+    return Landmarks(people, [person_distances(graph, p) for p in people])
+
+
+def write_landmarks(landmarks, directory):
+    """
+    Write `landmarks`, built from the CSVs in `directory`, next to them.
+    """
+    sections = {"people": array("i", landmarks.people)}
+    for i, distances in enumerate(landmarks.distances):
+        sections[f"distances/{i}"] = distances
+    write_sections(
+        os.path.join(directory, LANDMARKS_FILE), source_stats(directory), sections
+    )
+
+
+def load_landmarks(directory):
+    """
+    Load the landmarks for `directory`, or return None if they are
+    missing or the CSVs have changed since they were built.
+    """
+    sections = read_sections(
+        os.path.join(directory, LANDMARKS_FILE), source_stats(directory)
+    )
+    if sections is None:
+        return None
+    people = list(sections["people"])
+    distances = [sections[f"distances/{i}"] for i in range(len(people))]
+    return Landmarks(people, distances)
+
+
+def landmark_search(graph, landmarks, source, target):
+    """
+    A* search from `source` to `target`, using the landmark lower bound
+    on the remaining degrees as the heuristic.
+
+    As in search.bipartite_search, a movie's cast is scanned when the
+    first of its stars is expanded, and again only if a later star was
+    reached in fewer degrees. The heuristic is computed once per
+    landmark profile (see Landmarks.profiles) rather than per person.
+    """
+    if source == target:
+        return []
+    if landmarks.lower_bound(source, target) is None:
+        return None
+
+    # Everyone the search reaches shares the target's component, so is
+    # reached by the same landmarks as the target
+    profile_of, profiles = landmarks.profiles()
+    to_target = profiles[profile_of[target]]
+    active = [i for i, distance in enumerate(to_target) if distance != UNREACHABLE]
+    to_target = [to_target[i] for i in active]
+    estimate = [None] * len(profiles)
+
+    def heuristic(profile):
+        to_person = profiles[profile]
+        h = estimate[profile] = max(
+            map(abs, map(sub, [to_person[i] for i in active], to_target)),
+            default=0
+        )
+        return h
+
+    # Maps each reached person to the (movie, person) it was reached
+    # from, and its degrees from the source
+    parents = {source: None}
+    cost = {source: 0}
+    # Degrees from the source at which each movie's cast was scanned
+    movie_cost = {}
+    # Ties on estimated total are broken towards the deepest person
+    frontier = [(heuristic(profile_of[source]), 0, source)]
+    explored = set()
+
+    while frontier:
+        f, depth, person = heapq.heappop(frontier)
+        g = -depth
+        if person in explored:
+            continue
+        if person == target:
+            return parent_path(parents, target)
+        explored.add(person)
+
+        # Every person still queued is estimated at least `f` degrees
+        # away, so reaching the target in g + 1 <= f is optimal
+        finish = g + 1 <= f
+
+        # The heuristic is consistent, so explored people were all
+        # reached in at most g degrees and are skipped by their cost
+        for movie in graph.movies_of(person):
+            if movie_cost.get(movie, g + 1) <= g:
+                continue
+            movie_cost[movie] = g
+            for neighbor in graph.stars_of(movie):
+                if cost.get(neighbor, g + 2) <= g + 1:
+                    continue
+                cost[neighbor] = g + 1
+                parents[neighbor] = (movie, person)
+                if neighbor == target and finish:
+                    return parent_path(parents, target)
+                profile = profile_of[neighbor]
+                h = estimate[profile]
+                if h is None:
+                    h = heuristic(profile)
+                heapq.heappush(frontier, (g + 1 + h, -(g + 1), neighbor))
+
+    return None
@@ -0,0 +1,189 @@
+"""
+Name lookups for a graph.Graph beyond exact matches.
+
+Prefix matches are binary searches over the graph's sorted name order.
+Typo-tolerant matches use a trigram index to find candidate names that
+share enough trigrams with the query, and rank only those candidates by
+edit distance, so no lookup scans every person.
+"""
+from array import array
+from bisect import bisect_left
+from collections import Counter, namedtuple
+
+# A ranked match: lower scores are better, 0 is an exact match
+Candidate = namedtuple("Candidate", ["person_id", "name", "birth", "score"])
+
+# Most edits tolerated by a fuzzy match
+MAX_DISTANCE = 2
+
+
+class NameIndex():
+    """
+    Exact, prefix and fuzzy name lookups over the people of a graph.
+    """
+
+    def __init__(self, graph):
+        self.graph = graph
+        # Maps each trigram to the people whose names contain it,
+        # built on the first fuzzy lookup
+        self.trigrams = None
+
+    def add(self, person):
+        """
+        Adds a person appended to the graph after the index was built.
+        The graph's own name order is updated by Graph.add_person.
+        """
+        if self.trigrams is None:
+            return
+        name = self.graph.person_names[person].lower()
+        for trigram in trigrams(name):
+            self.trigrams.setdefault(trigram, array("i")).append(person)
+
+    def exact(self, name):
+        """
+        Returns the indices of all people called `name` (case-insensitive).
+        """
+        return self.graph.people_named(name)
+
+    def prefix(self, prefix, limit=None):
+        """
+        Returns the indices of people whose names start with `prefix`
+        (case-insensitive), in name order.
+        """
+        lookup = self.graph.name_lookup
+        prefix = prefix.lower()
+        people = []
+        i = bisect_left(lookup, prefix)
+        while i < len(lookup) and lookup[i].startswith(prefix):
+            if limit is not None and len(people) == limit:
+                break
+            people.append(lookup.order[i])
+            i += 1
+        return people
+
+    def fuzzy(self, name, max_distance=MAX_DISTANCE):
+        """
+        Returns (distance, person) pairs for people whose names are within
+        `max_distance` edits of `name` (case-insensitive), closest first.
+        """
+        if self.trigrams is None:
+            self.trigrams = build_trigrams(self.graph.person_names)
+
+        name = name.lower()
+        query = trigrams(name)
+
+        # Each edit changes at most three trigrams, so a match shares at
+        # least `needed` trigrams with the query and must appear in at
+        # least one of the postings of its rarest trigrams
+        needed = max(1, len(query) - 3 * max_distance)
+        postings = sorted(
+            (self.trigrams.get(trigram, ()) for trigram in query), key=len
+        )
+        rare = len(query) - needed + 1
+        hits = Counter()
+        for people in postings[:rare]:
+            hits.update(people)
+
+        # Count the common trigrams too, by binary search in their
+        # postings (which are in index order), and keep only the
+        # people who share enough
+        for people in postings[rare:]:
+            for person in hits:
+                i = bisect_left(people, person)
+                if i < len(people) and people[i] == person:
+                    hits[person] += 1
+        candidates = [person for person, count in hits.items() if count >= needed]
+
+        matches = []
+        for person in candidates:
+            candidate = self.graph.person_names[person].lower()
+            distance = edit_distance(name, candidate, max_distance)
+            if distance is not None:
+                matches.append((distance, person))
+        matches.sort()
+        return matches
+
+    def search(self, query, limit=10):
+        """
+        Returns up to `limit` Candidates for `query`, ranked by score:
+        exact matches score 0, prefix matches 1, and fuzzy matches
+        1 plus their edit distance, and are only looked for if there are
+        fewer than `limit` better matches. Ties go to people in more movies.
+        """
+        scores = {}
+        for person in self.exact(query):
+            scores[person] = 0
+        for person in self.prefix(query, limit=limit):
+            scores.setdefault(person, 1)
+
+        # Only look for typos if the cheaper lookups came up short
+        if len(scores) < limit:
+            for distance, person in self.fuzzy(query):
+                scores.setdefault(person, 1 + distance)
+
+        graph = self.graph
+        ranked = sorted(
+            scores,
+            key=lambda p: (scores[p], -len(graph.movies_of(p)), graph.person_names[p])
+        )
+        return [
+            Candidate(
+                graph.person_ids[p], graph.person_names[p],
+                graph.person_births[p], scores[p]
+            )
+            for p in ranked[:limit]
+        ]
+
+
+def trigrams(name):
+    """
+    Returns the set of trigrams of `name`, padded so that the
+    start and end of the name count.
+    """
+    padded = f"  {name} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def build_trigrams(names):
+    """
+    Returns a dict mapping each trigram to an array of the indices
+    of the (lowercased) names that contain it.
+    """
+    index = {}
+    for i, name in enumerate(names):
+        for trigram in trigrams(name.lower()):
+            postings = index.get(trigram)
+            if postings is None:
+                postings = index[trigram] = array("i")
+            postings.append(i)
+    return index
+
+
+def edit_distance(a, b, limit):
+    """
+    Returns the Levenshtein distance between `a` and `b`,
+    or None if it is greater than `limit`.
+
+    Only cells within `limit` of the diagonal are computed, since any
+    alignment that strays further already costs more than `limit`.
+    """
+    if abs(len(a) - len(b)) > limit:
+        return None
+    over = limit + 1
+    previous = [j if j <= limit else over for j in range(len(b) + 1)]
+    for i in range(1, len(a) + 1):
+        current = [over] * (len(b) + 1)
+        if i <= limit:
+            current[0] = i
+        x = a[i - 1]
+        for j in range(max(1, i - limit), min(len(b), i + limit) + 1):
+            current[j] = min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + (x != b[j - 1]),
+                over
+            )
+        if min(current) > limit:
+            return None
+        previous = current
+    return previous[-1] if previous[-1] <= limit else None
@@ -0,0 +1,188 @@
+"""
+Parallel CSV loading for a graph.Graph.
+
+Each CSV is split into byte ranges that start and end on line
+boundaries, and the ranges are parsed in a process pool. People and
+movies are parsed together; the stars are parsed once both are merged,
+with each worker given the id -> index maps so it can return index
+arrays ready for the CSR build.
+
+The CSR build that follows (graph.finish_graph) stays serial in the
+parent process: its arrays would cost as much to ship between processes
+as to build, so it bounds how far loading scales with cores.
+
+Splitting on line boundaries assumes no quoted field spans several
+lines, which holds for the IMDb exports this project uses.
+"""
+import csv
+import io
+import os
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+
+from graph import Graph, StringTable, finish_graph
+
+# Number of chunks each worker is given per file, to even out the load
+CHUNKS_PER_WORKER = 4
+
+# id -> index maps of the worker process, set by set_lookups
+lookups = None
+
+
+def load_graph_parallel(directory, workers=None):
+    """
+    Load people.csv, movies.csv and stars.csv from `directory` into a
+    new Graph, parsing chunks of each file across `workers` processes
+    (default: one per core).
+    """
+    workers = workers or os.cpu_count() or 1
+    chunks = workers * CHUNKS_PER_WORKER
+    graph = Graph()
+
+    people_path = os.path.join(directory, "people.csv")
+    movies_path = os.path.join(directory, "movies.csv")
+    stars_path = os.path.join(directory, "stars.csv")
+
+    # Parse people and movies concurrently
+    with ProcessPoolExecutor(workers) as pool:
+        people_parts = submit_chunks(
+            pool, parse_strings, people_path, ["id", "name", "birth"], chunks
+        )
+        movie_parts = submit_chunks(
+            pool, parse_strings, movies_path, ["id", "title", "year"], chunks
+        )
+        people = merge_strings(
+            [part.result() for part in people_parts],
+            [graph.person_ids, graph.person_names, graph.person_births]
+        )
+        movies = merge_strings(
+            [part.result() for part in movie_parts],
+            [graph.movie_ids, graph.movie_titles, graph.movie_years]
+        )
+
+    # Join the stars against the merged people and movies
+    star_people = array("i")
+    star_movies = array("i")
+    with ProcessPoolExecutor(
+        workers, initializer=set_lookups, initargs=(people, movies)
+    ) as pool:
+        star_parts = submit_chunks(
+            pool, parse_stars, stars_path, ["person_id", "movie_id"], chunks
+        )
+        for part in star_parts:
+            part_people, part_movies = part.result()
+            star_people.extend(part_people)
+            star_movies.extend(part_movies)
+
+    finish_graph(graph, people, movies, star_people, star_movies)
+    return graph
+
+
+def chunk_ranges(path, chunks):
+    """
+    Returns the header row of the CSV file at `path`, and up to `chunks`
+    (start, end) byte ranges covering the rest of the file, each
+    starting and ending on a line boundary.
+    """
+    size = os.path.getsize(path)
+    with open(path, "rb") as f:
+        header = next(csv.reader([f.readline().decode("utf-8")]), [])
+        bounds = [f.tell()]
+        for i in range(1, chunks):
+            f.seek(max(bounds[0], size * i // chunks))
+            f.readline()
+            position = f.tell()
+            if bounds[-1] < position < size:
+                bounds.append(position)
+        bounds.append(size)
+    return header, list(zip(bounds, bounds[1:]))
+
+
+def submit_chunks(pool, parse, path, columns, chunks):
+    """
+    Submits `parse` for every chunk of the CSV file at `path`,
+    returning the futures in file order.
+    """
+    header, ranges = chunk_ranges(path, chunks)
+    positions = [header.index(column) for column in columns]
+    return [
+        pool.submit(parse, path, start, end, positions)
+        for start, end in ranges
+        if end > start
+    ]
+
+
+def read_chunk(path, start, end, positions):
+    """
+    Yields the values at `positions` from each row in a byte range
+    of a CSV file.
+    """
+    with open(path, "rb") as f:
+        f.seek(start)
+        text = f.read(end - start).decode("utf-8")
+    for row in csv.reader(io.StringIO(text, newline="")):
+        if row:
+            yield [row[i] for i in positions]
+
+
+def parse_strings(path, start, end, positions):
+    """
+    Parses a chunk into one StringTable per column.
+    """
+    tables = [StringTable() for _ in positions]
+    for row in read_chunk(path, start, end, positions):
+        for table, value in zip(tables, row):
+            table.append(value)
+    return tables
+
+
+def merge_strings(parts, tables):
+    """
+    Appends the parsed chunks `parts` to `tables`, in order, skipping
+    rows whose id (the first column) was already seen.
+
+    Returns a dict mapping each id to its row index.
+    """
+    indices = {}
+    for part in parts:
+        ids = list(part[0])
+        if len(set(ids)) == len(ids) and not any(i in indices for i in ids):
+            for identifier in ids:
+                indices[identifier] = len(indices)
+            for table, column in zip(tables, part):
+                table.extend(column)
+            continue
+
+        # Fall back to row by row for chunks with repeated ids
+        for i, identifier in enumerate(ids):
+            if identifier in indices:
+                continue
+            indices[identifier] = len(indices)
+            for table, column in zip(tables, part):
+                table.append(column[i])
+    return indices
+
+
+def set_lookups(people, movies):
+    """
+    Stores the id -> index maps in a worker process.
+    """
+    global lookups
+    lookups = (people, movies)
+
+
+def parse_stars(path, start, end, positions):
+    """
+    Parses a chunk of stars.csv into (people, movies) index arrays,
+    skipping rows that reference unknown people or movies.
+    """
+    people, movies = lookups
+    star_people = array("i")
+    star_movies = array("i")
+    for person_id, movie_id in read_chunk(path, start, end, positions):
+        person = people.get(person_id)
+        movie = movies.get(movie_id)
+        if person is not None and movie is not None:
+            star_people.append(person)
+            star_movies.append(movie)
+    return star_people, star_movies
@@ -0,0 +1,201 @@
+"""
+Search algorithms over a graph.Graph.
+
+Every search takes person indices and returns the shortest list of
+(movie, person) index pairs leading from `source` to `target`,
+or None if the two people are not connected.
+"""
+from array import array
+from collections import deque
+
+# Parent stored for nodes a search has not reached, and for the source
+UNREACHED = -1
+START = -2
+
+
+def bipartite_search(graph, source, target):
+    """
+    Breadth-first search that treats movies as nodes of their own.
+
+    Each movie is visited once, the first time one of its stars is
+    expanded, so its cast is scanned only once however many of its stars
+    are reached. The path is rebuilt from person -> movie and
+    movie -> person parent pointers.
+    """
+    if source == target:
+        return []
+
+    # Maps each reached person to the movie it was reached through,
+    # and each visited movie to the person it was reached from
+    person_parent = {source: None}
+    movie_parent = {}
+    frontier = deque([source])
+
+    while frontier:
+        person = frontier.popleft()
+        for movie in graph.movies_of(person):
+            if movie in movie_parent:
+                continue
+            movie_parent[movie] = person
+            for star in graph.stars_of(movie):
+                if star in person_parent:
+                    continue
+                person_parent[star] = movie
+                if star == target:
+                    return bipartite_path(person_parent, movie_parent, source, target)
+                frontier.append(star)
+
+    return None
+
+
+def array_search(graph, source, target):
+    """
+    Bipartite breadth-first search that allocates no per-node objects.
+
+    The movie each person was reached through, the person each movie
+    was reached from, and the queue of people to expand all live in
+    integer arrays preallocated to the size of the graph.
+    """
+    if source == target:
+        return []
+
+    person_parent = array("i", [UNREACHED]) * graph.num_people
+    movie_parent = array("i", [UNREACHED]) * graph.num_movies
+    person_offsets = graph.person_offsets
+    person_movies = graph.person_movies
+    movie_offsets = graph.movie_offsets
+    movie_stars = graph.movie_stars
+
+    # Each person is queued at most once, so the queue never wraps
+    queue = array("i", bytes(4 * graph.num_people))
+    queue[0] = source
+    person_parent[source] = START
+    head = 0
+    tail = 1
+
+    while head < tail:
+        person = queue[head]
+        head += 1
+        for i in range(person_offsets[person], person_offsets[person + 1]):
+            movie = person_movies[i]
+            if movie_parent[movie] != UNREACHED:
+                continue
+            movie_parent[movie] = person
+            for j in range(movie_offsets[movie], movie_offsets[movie + 1]):
+                star = movie_stars[j]
+                if person_parent[star] != UNREACHED:
+                    continue
+                person_parent[star] = movie
+                if star == target:
+                    return bipartite_path(person_parent, movie_parent, source, target)
+                queue[tail] = star
+                tail += 1
+
+    return None
+
+
+def bipartite_path(person_parent, movie_parent, source, person):
+    """
+    Rebuilds the (movie, person) path from `source` to `person` from the
+    person -> movie and movie -> person parent pointers of a bipartite
+    search. The pointers may be dicts or arrays indexed by node.
+    """
+    path = []
+    while person != source:
+        movie = person_parent[person]
+        path.append((movie, person))
+        person = movie_parent[movie]
+    path.reverse()
+    return path
+
+
+def bidirectional_search(graph, source, target):
+    """
+    Breadth-first search grown from both `source` and `target`.
+
+    Each step expands one whole layer of whichever frontier is smaller,
+    and the search stops as soon as the two sides meet.
+    """
+    if source == target:
+        return []
+
+    # Maps each reached person to the (movie, person) it was reached from
+    forward = {source: None}
+    backward = {target: None}
+    forward_frontier = [source]
+    backward_frontier = [target]
+
+    # Movies whose casts each side has already scanned
+    forward_movies = set()
+    backward_movies = set()
+
+    while forward_frontier and backward_frontier:
+        if len(forward_frontier) <= len(backward_frontier):
+            forward_frontier, meeting = _expand(
+                graph, forward_frontier, forward, forward_movies, backward
+            )
+            if meeting is not None:
+                person, movie, other = meeting
+                return _join(forward, backward, person, movie, other)
+        else:
+            backward_frontier, meeting = _expand(
+                graph, backward_frontier, backward, backward_movies, forward
+            )
+            if meeting is not None:
+                person, movie, other = meeting
+                return _join(forward, backward, other, movie, person)
+
+    return None
+
+
+def _expand(graph, frontier, parents, seen_movies, other_parents):
+    """
+    Expands one layer of a bidirectional search. Each movie's cast is
+    scanned at most once per side.
+
+    Returns the next layer and, if the two sides met, a
+    (person, movie, other) triple where `person` was reached by this side
+    and `other` by the other side. Otherwise the triple is None.
+    """
+    layer = []
+    for person in frontier:
+        for movie in graph.movies_of(person):
+            if movie in seen_movies:
+                continue
+            seen_movies.add(movie)
+            for neighbor in graph.stars_of(movie):
+                if neighbor in parents:
+                    continue
+                parents[neighbor] = (movie, person)
+                if neighbor in other_parents:
+                    return layer, (person, movie, neighbor)
+                layer.append(neighbor)
+    return layer, None
+
+
+def _join(forward, backward, person, movie, other):
+    """
+    Joins the forward chain ending at `person` and the backward chain
+    starting at `other` through `movie` into a single path.
+    """
+    path = parent_path(forward, person)
+    path.append((movie, other))
+    while backward[other] is not None:
+        step_movie, child = backward[other]
+        path.append((step_movie, child))
+        other = child
+    return path
+
+
+def parent_path(parents, person):
+    """
+    Returns the (movie, person) path to `person` by following `parents`
+    back to the person with no parent.
+    """
+    path = []
+    while parents[person] is not None:
+        movie, parent = parents[person]
+        path.append((movie, person))
+        person = parent
+    path.reverse()
+    return path
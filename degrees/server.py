@@ -0,0 +1,164 @@
+"""
+Long-running local query server for degrees.
+
+Loads the graph once and answers requests over HTTP on localhost:
+
+    GET /path?source=<person_id>&target=<person_id>
+    GET /person?name=<name>[&limit=<n>]
+
+Responses are JSON. Paths are kept in a bounded LRU cache keyed by the
+unordered (source, target) pair, so a hot pair is answered without
+searching again in either direction.
+"""
+import json
+import sys
+import threading
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import degrees
+
+HOST = "127.0.0.1"
+PORT = 8050
+
+# Number of paths kept in the cache
+CACHE_SIZE = 10000
+
+
+class PathCache():
+    """
+    Thread-safe LRU cache of shortest paths keyed by unordered pairs.
+    """
+
+    def __init__(self, maxsize=CACHE_SIZE):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, source, target):
+        """
+        Returns (True, path) with the cached path from `source` to
+        `target`, or (False, None) if the pair is not cached.
+        """
+        key = frozenset([source, target])
+        with self.lock:
+            if key not in self.entries:
+                self.misses += 1
+                return False, None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            start, path = self.entries[key]
+        if path is None or start == source:
+            return True, path
+        return True, reverse_path(start, path)
+
+    def put(self, source, target, path):
+        key = frozenset([source, target])
+        with self.lock:
+            self.entries[key] = (source, path)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+
+
+def reverse_path(source, path):
+    """
+    Returns the path from the end of `path` back to `source`.
+    """
+    people = [source] + [person_id for _, person_id in path]
+    movies = [movie_id for movie_id, _ in path]
+    return [
+        (movies[i], people[i])
+        for i in range(len(movies) - 1, -1, -1)
+    ]
+
+
+cache = PathCache()
+
+
+class Handler(BaseHTTPRequestHandler):
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = {key: values[0] for key, values in parse_qs(url.query).items()}
+        if url.path == "/path":
+            status, body = self.shortest_path(query)
+        elif url.path == "/person":
+            status, body = self.person(query)
+        else:
+            status, body = 404, {"error": "not found"}
+        self.respond(status, body)
+
+    def shortest_path(self, query):
+        source = query.get("source")
+        target = query.get("target")
+        if source is None or target is None:
+            return 400, {"error": "source and target are required"}
+        for person_id in [source, target]:
+            if degrees.graph.person_index(person_id) is None:
+                return 404, {"error": f"unknown person {person_id}"}
+
+        found, path = cache.get(source, target)
+        if not found:
+            path = degrees.shortest_path(source, target)
+            cache.put(source, target, path)
+
+        if path is None:
+            return 200, {"source": source, "target": target, "degrees": None}
+        return 200, {
+            "source": source,
+            "target": target,
+            "degrees": len(path),
+            "path": [
+                {"movie_id": movie_id, "person_id": person_id}
+                for movie_id, person_id in path
+            ]
+        }
+
+    def person(self, query):
+        name = query.get("name")
+        if name is None:
+            return 400, {"error": "name is required"}
+        try:
+            limit = int(query.get("limit", 10))
+        except ValueError:
+            return 400, {"error": "limit must be an integer"}
+        people = [candidate._asdict() for candidate in degrees.match_names(name, limit)]
+        return 200, {"name": name, "people": people}
+
+    def respond(self, status, body):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def main():
+    if len(sys.argv) not in [2, 3]:
+        sys.exit("Usage: python server.py directory [port]")
+    port = int(sys.argv[2]) if len(sys.argv) == 3 else PORT
+
+    print("Loading data...")
+    degrees.load_data(sys.argv[1])
+    print("Data loaded.")
+
+    server = ThreadingHTTPServer((HOST, port), Handler)
+    print(f"Serving on http://{HOST}:{port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+"""
+Compiled on-disk snapshot of a graph.Graph.
+
+A snapshot is a single file written next to the CSVs it was built from.
+It starts with a JSON header describing the source files and the
+location of every array, followed by the raw arrays themselves. Loading
+memory-maps the file, so the arrays are used in place without parsing.
+"""
+import json
+import mmap
+import os
+from array import array
+
+from graph import Graph, SortedIndex, StringTable
+
+SNAPSHOT = "graph.snapshot"
+MAGIC = b"DEGSNAP2"
+SOURCES = ["people.csv", "movies.csv", "stars.csv"]
+
+# Graph attributes stored as integer arrays and as string tables
+ARRAYS = [
+    "person_offsets", "person_movies", "movie_offsets", "movie_stars",
+    "components", "component_sizes"
+]
+STRINGS = [
+    "person_ids", "person_names", "person_births",
+    "movie_ids", "movie_titles", "movie_years"
+]
+
+
+def snapshot_path(directory):
+    return os.path.join(directory, SNAPSHOT)
+
+
+def source_stats(directory):
+    """
+    Returns the size and modification time of each source CSV.
+    """
+    stats = {}
+    for filename in SOURCES:
+        stat = os.stat(os.path.join(directory, filename))
+        stats[filename] = [stat.st_size, stat.st_mtime_ns]
+    return stats
+
+
+def write_snapshot(graph, directory):
+    """
+    Write a snapshot of `graph`, built from the CSVs in `directory`.
+    """
+    sections = {}
+    for name in ARRAYS:
+        sections[name] = getattr(graph, name)
+    for name in STRINGS:
+        table = getattr(graph, name)
+        sections[f"{name}/offsets"] = table.offsets
+        sections[f"{name}/data"] = table.data
+
+    # Sort orders used for binary search lookups
+    sections["person_order"] = graph.person_lookup.order
+    sections["movie_order"] = graph.movie_lookup.order
+    sections["name_order"] = graph.name_lookup.order
+
+    write_sections(snapshot_path(directory), source_stats(directory), sections)
+
+
+def load_snapshot(directory):
+    """
+    Load the snapshot for `directory` into a new Graph.
+
+    Returns None if there is no snapshot, or if the CSVs have changed
+    since it was written.
+    """
+    sections = read_sections(snapshot_path(directory), source_stats(directory))
+    if sections is None:
+        return None
+
+    graph = Graph()
+    for name in ARRAYS:
+        setattr(graph, name, sections[name])
+    for name in STRINGS:
+        table = StringTable(sections[f"{name}/offsets"], sections[f"{name}/data"])
+        setattr(graph, name, table)
+    graph.person_lookup = SortedIndex(graph.person_ids, sections["person_order"])
+    graph.movie_lookup = SortedIndex(graph.movie_ids, sections["movie_order"])
+    graph.name_lookup = SortedIndex(
+        graph.person_names, sections["name_order"], key=str.lower, unique=False
+    )
+    return graph
+
+
+def write_sections(path, sources, sections):
+    """
+    Write the named arrays in `sections` to the file at `path`, recording
+    `sources` so that readers can tell whether the file is stale.
+    """
+    # Lay the sections out after the header, each aligned to 8 bytes
+    layout = {}
+    position = 0
+    for name, values in sections.items():
+        layout[name] = [position, len(values), values.typecode]
+        position = align(position + len(values) * values.itemsize)
+    header = json.dumps({
+        "sources": sources,
+        "sections": layout
+    }).encode("utf-8")
+    start = align(len(MAGIC) + 8 + len(header))
+
+    # Write to a temporary file and swap it in, so readers never see
+    # a partially written file
+    temporary = f"{path}.{os.getpid()}.tmp"
+    with open(temporary, "wb") as f:
+        f.write(MAGIC)
+        f.write(len(header).to_bytes(8, "little"))
+        f.write(header)
+        for name, values in sections.items():
+            f.seek(start + layout[name][0])
+            values.tofile(f)
+        f.truncate(start + position)
+    os.replace(temporary, path)
+
+
+def read_sections(path, sources):
+    """
+    Memory-map the file at `path` and return its named arrays.
+
+    Returns None if the file is missing, unreadable, or was written
+    from sources other than `sources`.
+    """
+    try:
+        with open(path, "rb") as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                return None
+            length = int.from_bytes(f.read(8), "little")
+            header = json.loads(f.read(length))
+            if header["sources"] != sources:
+                return None
+            buffer = memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+    except (OSError, ValueError):
+        return None
+
+    start = align(len(MAGIC) + 8 + length)
+    sections = {}
+    for name, (offset, count, typecode) in header["sections"].items():
+        itemsize = array(typecode).itemsize
+        view = buffer[start + offset:start + offset + count * itemsize]
+        sections[name] = view.cast(typecode)
+    return sections
+
+
+def align(position):
+    return (position + 7) // 8 * 8
@@ -0,0 +1,106 @@
+"""
+Single-source breadth-first search trees over a graph.Graph.
+
+A SourceTree runs one full bipartite BFS from a source person and keeps
+the parent pointers and distances in arrays, so the path to any target
+can be read off in O(path length). A TreeCache keeps the trees of the
+most recently used sources.
+"""
+from array import array
+from collections import OrderedDict
+
+from search import bipartite_path
+
+# Number of source trees kept by a TreeCache
+TREES = 8
+
+# Parent and distance stored for nodes the source cannot reach
+UNREACHED = -1
+
+
+class SourceTree():
+    """
+    Breadth-first search tree of every person reachable from `source`.
+    """
+
+    def __init__(self, graph, source):
+        self.source = source
+        # Movie each person was reached through, person each movie was
+        # reached from, and each person's degrees of separation
+        self.person_parent = array("i", [UNREACHED]) * graph.num_people
+        self.movie_parent = array("i", [UNREACHED]) * graph.num_movies
+        self.distances = array("h", [UNREACHED]) * graph.num_people
+
+        self.distances[source] = 0
+        frontier = [source]
+        depth = 0
+        while frontier:
+            depth += 1
+            layer = []
+            for person in frontier:
+                for movie in graph.movies_of(person):
+                    if self.movie_parent[movie] != UNREACHED:
+                        continue
+                    self.movie_parent[movie] = person
+                    for star in graph.stars_of(movie):
+                        if self.distances[star] != UNREACHED:
+                            continue
+                        self.distances[star] = depth
+                        self.person_parent[star] = movie
+                        layer.append(star)
+            frontier = layer
+
+    def distance(self, target):
+        """
+        Returns the degrees of separation from the source to `target`,
+        or None if they are not connected.
+        """
+        distance = self.distances[target]
+        return None if distance == UNREACHED else distance
+
+    def path(self, target):
+        """
+        Returns the (movie, person) path from the source to `target`,
+        or None if they are not connected.
+        """
+        if self.distances[target] == UNREACHED:
+            return None
+        return bipartite_path(
+            self.person_parent, self.movie_parent, self.source, target
+        )
+
+    def histogram(self):
+        """
+        Returns a dict mapping each degree of separation from the source
+        to the number of people that far away. People the source cannot
+        reach are counted under None.
+        """
+        counts = {}
+        for distance in self.distances:
+            key = None if distance == UNREACHED else distance
+            counts[key] = counts.get(key, 0) + 1
+        return counts
+
+
+class TreeCache():
+    """
+    LRU cache of the SourceTrees of the most recently used sources.
+    """
+
+    def __init__(self, graph, maxsize=TREES):
+        self.graph = graph
+        self.maxsize = maxsize
+        self.trees = OrderedDict()
+
+    def tree(self, source):
+        """
+        Returns the SourceTree for `source`, building it if needed.
+        """
+        if source in self.trees:
+            self.trees.move_to_end(source)
+            return self.trees[source]
+        tree = SourceTree(self.graph, source)
+        self.trees[source] = tree
+        while len(self.trees) > self.maxsize:
+            self.trees.popitem(last=False)
+        return tree
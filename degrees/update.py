@@ -0,0 +1,47 @@
+"""
+Apply a daily delta to a degrees data directory without reloading it.
+
+The delta directory holds any of people.csv, movies.csv and stars.csv
+with the same columns as the full data. Their rows are added to the
+loaded graph, appended to the full CSVs, and the snapshot is rewritten.
+"""
+import os
+import sys
+
+import degrees
+from graph import read_rows
+
+COLUMNS = {
+    "people.csv": ["id", "name", "birth"],
+    "movies.csv": ["id", "title", "year"],
+    "stars.csv": ["person_id", "movie_id"]
+}
+
+
+def main():
+    if len(sys.argv) != 3:
+        sys.exit("Usage: python update.py directory delta")
+    directory, delta = sys.argv[1:]
+
+    print("Loading data...")
+    degrees.load_data(directory)
+    print("Data loaded.")
+
+    rows = {}
+    for filename, columns in COLUMNS.items():
+        if os.path.exists(os.path.join(delta, filename)):
+            rows[filename] = list(read_rows(delta, filename, columns))
+        else:
+            rows[filename] = []
+
+    people, movies, stars = degrees.append_data(
+        directory,
+        people=rows["people.csv"],
+        movies=rows["movies.csv"],
+        stars=rows["stars.csv"]
+    )
+    print(f"Added {people} people, {movies} movies and {stars} stars.")
+
+
+if __name__ == "__main__":
+    main()
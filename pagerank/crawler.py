@@ -0,0 +1,110 @@
+"""
+Parallel, cached crawling of a pagerank corpus.
+
+The links found in each HTML file are kept in a cache file next to the
+pages, keyed by filename along with the file's size and modification
+time. A re-crawl lists the directory and reads only the files that are
+new or changed, parsing them in a process pool when there are many;
+an unchanged corpus is crawled without opening a single page.
+"""
+import json
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+
+CACHE = "links.cache"
+
+# Parse in a process pool only when at least this many files changed
+PARALLEL_THRESHOLD = 64
+
+# Files handed to a worker at a time
+CHUNKSIZE = 16
+
+LINK = re.compile(r"<a\s+(?:[^>]*?)href=\"([^\"]*)\"")
+
+
+def cache_path(directory):
+    return os.path.join(directory, CACHE)
+
+
+def cached_crawl(directory, workers=None):
+    """
+    Parse a directory of HTML pages like pagerank.crawl, reusing the
+    links cached for files that have not changed, and update the cache.
+    """
+    cache = read_cache(directory)
+
+    # Stat every page, keeping cached links for those that are unchanged
+    entries = {}
+    changed = []
+    with os.scandir(directory) as files:
+        for entry in files:
+            if not entry.name.endswith(".html"):
+                continue
+            stat = entry.stat()
+            key = [stat.st_size, stat.st_mtime_ns]
+            cached = cache.get(entry.name)
+            if cached is not None and cached[:2] == key:
+                entries[entry.name] = cached
+            else:
+                entries[entry.name] = key
+                changed.append(entry.name)
+
+    paths = [os.path.join(directory, filename) for filename in changed]
+    if len(changed) >= PARALLEL_THRESHOLD and workers != 1:
+        with ProcessPoolExecutor(workers) as pool:
+            parsed = list(pool.map(parse_links, paths, chunksize=CHUNKSIZE))
+    else:
+        parsed = [parse_links(path) for path in paths]
+    for filename, links in zip(changed, parsed):
+        entries[filename] = entries[filename] + [links]
+
+    if changed or len(entries) != len(cache):
+        try:
+            write_cache(directory, entries)
+        except OSError:
+            pass
+
+    # Only include links to other pages in the corpus
+    pages = dict()
+    for filename, (_, _, links) in entries.items():
+        pages[filename] = set(
+            link for link in links
+            if link in entries and link != filename
+        )
+    return pages
+
+
+def parse_links(path):
+    """
+    Returns the sorted list of distinct links in the HTML file at `path`.
+    """
+    with open(path) as f:
+        contents = f.read()
+    return sorted(set(LINK.findall(contents)))
+
+
+def read_cache(directory):
+    """
+    Returns the cached [size, mtime_ns, links] entry of each page,
+    or an empty dict if there is no readable cache.
+    """
+    try:
+        with open(cache_path(directory)) as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return cache if isinstance(cache, dict) else {}
+
+
+def write_cache(directory, entries):
+    """
+    Write the cache entries of `directory`.
+    """
+    # Write to a temporary file and swap it in, so readers never see
+    # a partially written file
+    path = cache_path(directory)
+    temporary = f"{path}.{os.getpid()}.tmp"
+    with open(temporary, "w") as f:
+        json.dump(entries, f)
+    os.replace(temporary, path)
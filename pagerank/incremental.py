@@ -0,0 +1,140 @@
+"""
+Warm-started PageRank after edits to a corpus.
+
+PageRank is the solution of the linear system
+
+    x = (1 - d) / N + d * (links(x) + dangling(x) / N)
+
+where links(x) passes each page's rank evenly along its links and
+dangling(x) is the total rank of pages with no links. Starting from the
+ranks of the corpus before the edit, the residual of this system is
+close to zero except next to pages whose links changed. So the residual
+is set up from the diff alone, and then pushed: a page with a large
+residual absorbs it into its rank and passes d times it along its
+links, as a random surfer would. Only pages the change reaches do any
+work.
+
+Residual spread evenly over every page (the teleport share changing
+with N, or rank leaving pages with no links) is never pushed. An even
+residual u only adds u * N / (1 - d) times the PageRank vector itself to
+the answer, so it changes the ranks' scale but not their proportions.
+Once the local pushes are done, rescaling the ranks to sum to 1 applies
+all of it at once.
+"""
+from collections import deque
+
+from matrix import TOLERANCE
+
+
+def corpus_diff(old, new):
+    """
+    Returns the changes from corpus `old` to corpus `new` as a dict of
+    "added_pages" and "removed_pages" sets, and "added_links" and
+    "removed_links" dicts mapping pages to the sets of links they
+    gained or lost. Added and removed pages gain or lose all their links.
+    """
+    diff = {
+        "added_pages": set(new) - set(old),
+        "removed_pages": set(old) - set(new),
+        "added_links": {},
+        "removed_links": {}
+    }
+    for page in set(old) | set(new):
+        old_links = old.get(page, set())
+        new_links = new.get(page, set())
+        if new_links - old_links:
+            diff["added_links"][page] = new_links - old_links
+        if old_links - new_links:
+            diff["removed_links"][page] = old_links - new_links
+    return diff
+
+
+def update_pagerank(corpus, ranks, damping_factor, diff, tolerance=TOLERANCE):
+    """
+    Return PageRank values for each page of the edited `corpus`, given
+    the converged `ranks` of the corpus before the edit and the `diff`
+    between the two (as returned by corpus_diff). Pushes until the
+    residual left on every page is at most `tolerance` / N.
+
+    Return a dictionary where keys are page names, and values are
+    their estimated PageRank value (a value between 0 and 1). All
+    PageRank values should sum to 1.
+    """
+    d = damping_factor
+    n = len(corpus)
+    added_links = diff["added_links"]
+    removed_links = diff["removed_links"]
+
+    # Start from the old ranks; new pages start with nothing
+    x = {page: ranks.get(page, 0) for page in corpus}
+    residual = dict.fromkeys(corpus, 0)
+
+    # Each changed page stops passing rank along its old links
+    # and starts passing it along its new ones
+    changed = set(added_links) | set(removed_links) | diff["removed_pages"]
+    touched = set()
+    for page in changed:
+        new_links = corpus.get(page, set())
+        old_links = new_links - added_links.get(page, set())
+        old_links = old_links | removed_links.get(page, set())
+        if old_links:
+            share = d * ranks.get(page, 0) / len(old_links)
+            for link in old_links:
+                if link in residual:
+                    residual[link] -= share
+                    touched.add(link)
+        if new_links:
+            share = d * x[page] / len(new_links)
+            for link in new_links:
+                residual[link] += share
+                touched.add(link)
+
+    # Before the edit, every page got the same teleport and dangling
+    # share, which a new page is owed on top of its links. How that
+    # share changes with the edit is the same on every page, so it is
+    # left to the final rescaling.
+    if diff["added_pages"]:
+        dangling = 0
+        for page, rank in ranks.items():
+            if page in changed:
+                old_links = corpus.get(page, set()) - added_links.get(page, set())
+                old_links = old_links | removed_links.get(page, set())
+            else:
+                old_links = corpus[page]
+            if not old_links:
+                dangling += rank
+        base = ((1 - d) + d * dangling) / len(ranks)
+        for page in diff["added_pages"]:
+            residual[page] += base
+            touched.add(page)
+
+    push(corpus, x, residual, d, tolerance / n, touched)
+    total = sum(x.values())
+    return {page: rank / total for page, rank in x.items()}
+
+
+def push(corpus, x, residual, damping_factor, threshold, pages):
+    """
+    Pushes residuals larger than `threshold` into their pages' ranks,
+    passing d times each along the page's links, starting from `pages`,
+    until none is left. What a page with no links passes on is spread
+    evenly over every page, so it is left to the caller's rescaling.
+    """
+    queue = deque(page for page in pages if abs(residual[page]) > threshold)
+    queued = set(queue)
+    while queue:
+        page = queue.popleft()
+        queued.discard(page)
+        amount = residual[page]
+        residual[page] = 0
+        x[page] += amount
+
+        links = corpus[page]
+        if not links:
+            continue
+        share = damping_factor * amount / len(links)
+        for link in links:
+            residual[link] += share
+            if abs(residual[link]) > threshold and link not in queued:
+                queued.add(link)
+                queue.append(link)
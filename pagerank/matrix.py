@@ -0,0 +1,454 @@
+"""
+Sparse power iteration for PageRank.
+
+A LinkMatrix stores a corpus once as a column-stochastic link matrix in
+compressed sparse row form, transposed so that each row lists the pages
+linking *to* a page. One sweep of power iteration is then a single pass
+over the links, O(pages + links), instead of a scan of the whole corpus
+for every page.
+
+Pages with no links spread their rank evenly over every page. Rather
+than materialise those links, their total rank is kept as one scalar
+per sweep and added to every page.
+"""
+import math
+from array import array
+from itertools import islice
+
+# Stop once the ranks move less than this in total (L1 norm)
+TOLERANCE = 1e-6
+
+# Give up after this many sweeps
+MAX_ITERATIONS = 1000
+
+# Sweeps between extrapolations
+EXTRAPOLATION_PERIOD = 10
+
+# Ways of measuring how far the ranks moved in a sweep
+NORMS = {
+    "l1": lambda changes: sum(map(abs, changes)),
+    "l2": lambda changes: math.sqrt(sum(change * change for change in changes)),
+    "max": lambda changes: max(map(abs, changes), default=0)
+}
+
+
+class LinkMatrix():
+    """
+    The links of a corpus as a sparse column-stochastic matrix.
+    """
+
+    def __init__(self, corpus):
+        # Pages in a fixed order, and each page's position in it
+        self.pages = list(corpus)
+        self.index = {page: i for i, page in enumerate(self.pages)}
+
+        sources = array("i")
+        destinations = array("i")
+        self.out_degrees = array("i", bytes(4 * self.size))
+        for page, links in corpus.items():
+            source = self.index[page]
+            for link in links:
+                destination = self.index.get(link)
+                if destination is None:
+                    continue
+                sources.append(source)
+                destinations.append(destination)
+                self.out_degrees[source] += 1
+
+        # Pages linking to each page, in CSR form
+        self.offsets, self.sources = build_csr(self.size, destinations, sources)
+        self.in_degrees = array(
+            "i", (end - start for start, end in zip(self.offsets, self.offsets[1:]))
+        )
+
+        # Pages with no links, whose rank is spread over every page
+        self.dangling = array(
+            "i", (i for i, degree in enumerate(self.out_degrees) if degree == 0)
+        )
+
+    @property
+    def size(self):
+        return len(self.pages)
+
+    def ranks(self, vector):
+        """
+        Returns a dict mapping each page to its value in `vector`.
+        """
+        return dict(zip(self.pages, vector))
+
+    def vector(self, ranks):
+        """
+        Returns the values of a page -> rank dict as a list in page order.
+        Pages missing from `ranks` get 0.
+        """
+        return [ranks.get(page, 0) for page in self.pages]
+
+    def shares(self, vector):
+        """
+        Returns the rank each page passes along each of its links,
+        and the total rank of the pages with no links.
+        """
+        shares = [
+            rank / degree if degree else 0
+            for rank, degree in zip(vector, self.out_degrees)
+        ]
+        dangling = sum(vector[i] for i in self.dangling)
+        return shares, dangling
+
+    def inflows(self, shares):
+        """
+        Returns the rank flowing into each page along its incoming links,
+        in one pass over the links.
+        """
+        flow = map(shares.__getitem__, self.sources)
+        return [sum(islice(flow, degree)) for degree in self.in_degrees]
+
+    def inflow(self, page, shares):
+        """
+        Returns the rank flowing into `page` along its incoming links.
+        """
+        start, end = self.offsets[page], self.offsets[page + 1]
+        return sum(map(shares.__getitem__, self.sources[start:end]))
+
+
+def build_csr(size, keys, values):
+    """
+    Groups `values` by `keys` (both integer arrays of equal length) into
+    CSR form for `size` rows using a counting sort.
+
+    Returns an (offsets, indices) pair of arrays.
+    """
+    offsets = array("q", bytes(8 * (size + 1)))
+    for key in keys:
+        offsets[key + 1] += 1
+    for i in range(size):
+        offsets[i + 1] += offsets[i]
+
+    indices = array("i", bytes(4 * len(values)))
+    cursor = array("q", offsets[:-1])
+    for key, value in zip(keys, values):
+        indices[cursor[key]] = value
+        cursor[key] += 1
+    return offsets, indices
+
+
+def power_iteration(matrix, damping_factor, tolerance=TOLERANCE,
+                    max_iterations=MAX_ITERATIONS, ranks=None, norm="l1",
+                    trace=None):
+    """
+    Returns the PageRank vector of `matrix`, in page order, by power
+    iteration (Jacobi updates) from `ranks` (default: the uniform vector)
+    until the ranks move less than `tolerance` in the given `norm`.
+
+    If `trace` is a list, each sweep's change is appended to it.
+    """
+    n = matrix.size
+    if ranks is None:
+        ranks = [1 / n] * n
+    for _ in range(max_iterations):
+        new_ranks = sweep(matrix, ranks, damping_factor)
+        change = NORMS[norm]([new - old for new, old in zip(new_ranks, ranks)])
+        ranks = new_ranks
+        if trace is not None:
+            trace.append(change)
+        if change < tolerance:
+            break
+    return ranks
+
+
+def gauss_seidel(matrix, damping_factor, tolerance=TOLERANCE,
+                 max_iterations=MAX_ITERATIONS, ranks=None, norm="l1",
+                 trace=None):
+    """
+    Like power_iteration, but updates the ranks in place, so each page
+    already sees the new ranks of the pages before it in the sweep.
+
+    In-place updates do not keep the ranks summing to 1, and the error
+    that builds up along the PageRank vector itself would otherwise
+    decay slower than with Jacobi updates, so the ranks are rescaled to
+    sum to 1 after every sweep.
+    """
+    n = matrix.size
+    d = damping_factor
+    ranks = normalize([1 / n] * n if ranks is None else ranks)
+    out_degrees = matrix.out_degrees
+    for _ in range(max_iterations):
+        previous = ranks
+        ranks = list(ranks)
+        shares, dangling = matrix.shares(ranks)
+        for page in range(n):
+            rank = (1 - d) / n + d * (dangling / n + matrix.inflow(page, shares))
+            if out_degrees[page]:
+                shares[page] = rank / out_degrees[page]
+            else:
+                dangling += rank - ranks[page]
+            ranks[page] = rank
+        ranks = normalize(ranks)
+        change = NORMS[norm]([new - old for new, old in zip(ranks, previous)])
+        if trace is not None:
+            trace.append(change)
+        if change < tolerance:
+            break
+    return ranks
+
+
+def aitken(matrix, damping_factor, tolerance=TOLERANCE,
+           max_iterations=MAX_ITERATIONS, ranks=None, norm="l1", trace=None):
+    """
+    Like power_iteration, but every EXTRAPOLATION_PERIOD sweeps replaces
+    the ranks by the Aitken extrapolation of the last three iterates.
+    """
+    return extrapolated_iteration(
+        matrix, damping_factor, tolerance, max_iterations, ranks, norm, trace,
+        aitken_extrapolation, 3
+    )
+
+
+def quadratic(matrix, damping_factor, tolerance=TOLERANCE,
+              max_iterations=MAX_ITERATIONS, ranks=None, norm="l1", trace=None):
+    """
+    Like power_iteration, but every EXTRAPOLATION_PERIOD sweeps replaces
+    the ranks by the quadratic extrapolation of the last four iterates.
+    """
+    return extrapolated_iteration(
+        matrix, damping_factor, tolerance, max_iterations, ranks, norm, trace,
+        quadratic_extrapolation, 4
+    )
+
+
+def extrapolated_iteration(matrix, damping_factor, tolerance, max_iterations,
+                           ranks, norm, trace, extrapolate, points):
+    """
+    Power iteration that every EXTRAPOLATION_PERIOD sweeps replaces the
+    ranks by `extrapolate` applied to the last `points` iterates.
+    """
+    n = matrix.size
+    ranks = [1 / n] * n if ranks is None else ranks
+    history = [ranks]
+    for iteration in range(1, max_iterations + 1):
+        new_ranks = sweep(matrix, ranks, damping_factor)
+        change = NORMS[norm]([new - old for new, old in zip(new_ranks, ranks)])
+        if trace is not None:
+            trace.append(change)
+        if change < tolerance:
+            return new_ranks
+        history = history[-(points - 1):] + [new_ranks]
+        if iteration % EXTRAPOLATION_PERIOD == 0 and len(history) == points:
+            new_ranks = normalize(extrapolate(history, damping_factor))
+            history = [new_ranks]
+        ranks = new_ranks
+    return ranks
+
+
+def aitken_extrapolation(history, damping_factor):
+    """
+    Returns the Aitken extrapolation of three successive iterates,
+    taken along the whole vector: assuming the error is dominated by one
+    direction scaled by a ratio between -1 and 1 per sweep, the ratio is
+    fitted from the last two steps by least squares and the rest of the
+    geometric series of steps is added to the latest iterate.
+    """
+    x0, x1, x2 = history
+    previous = [b - a for a, b in zip(x0, x1)]
+    step = [b - a for a, b in zip(x1, x2)]
+    scale = sum(a * a for a in previous)
+    if scale == 0:
+        return x2
+    ratio = sum(a * b for a, b in zip(previous, step)) / scale
+    if not -1 < ratio < 1:
+        return x2
+    return [x + s * ratio / (1 - ratio) for x, s in zip(x2, step)]
+
+
+def quadratic_extrapolation(history, damping_factor):
+    """
+    Returns the quadratic extrapolation of four successive iterates
+    (Kamvar et al.), which assumes the first iterate is a combination of
+    the PageRank vector and the two slowest-decaying error directions,
+    fits the characteristic polynomial of those directions by least
+    squares, and removes them.
+    """
+    x0, x1, x2, x3 = history
+    y1 = [b - a for a, b in zip(x0, x1)]
+    y2 = [b - a for a, b in zip(x0, x2)]
+    y3 = [b - a for a, b in zip(x0, x3)]
+
+    # Least squares solution of [y1 y2] (g1, g2) = -y3
+    a11 = sum(a * a for a in y1)
+    a12 = sum(a * b for a, b in zip(y1, y2))
+    a22 = sum(b * b for b in y2)
+    b1 = -sum(a * c for a, c in zip(y1, y3))
+    b2 = -sum(b * c for b, c in zip(y2, y3))
+    determinant = a11 * a22 - a12 * a12
+    if determinant == 0:
+        return x3
+    g1 = (b1 * a22 - b2 * a12) / determinant
+    g2 = (a11 * b2 - a12 * b1) / determinant
+
+    # Coefficients of the polynomial divided by (x - 1)
+    c1 = g1 + g2 + 1
+    c2 = g2 + 1
+    return [
+        c1 * r1 + c2 * r2 + r3
+        for r1, r2, r3 in zip(x1, x2, x3)
+    ]
+
+
+def adaptive(matrix, damping_factor, tolerance=TOLERANCE,
+             max_iterations=MAX_ITERATIONS, ranks=None, norm="l1", trace=None):
+    """
+    Like power_iteration, but only works on the pages whose ranks are
+    still converging.
+
+    Leaving out the rank spread by pages with no links, which reaches
+    every page evenly, only changes the PageRank vector's scale, so this
+    solves x = (1 - d) / N + d * links(x) and rescales x to sum to 1 at
+    the end. Each page keeps the residual of that system; a sweep visits
+    only the active pages, whose residual is above `tolerance` / N, and
+    each absorbs its residual into its rank and passes d times it along
+    its links. The next sweep's active pages are those it passed residual
+    to. Pages whose residual has died out, such as pages no one links to
+    after the first sweep, drop out of the sweeps altogether.
+
+    Stops once no page is active, whatever the `norm`; if `trace` is a
+    list, each sweep's change in rank, in that norm, is appended to it.
+    """
+    n = matrix.size
+    d = damping_factor
+    out_degrees = matrix.out_degrees
+    threshold = tolerance / n
+
+    # Pages each page links to, in CSR form
+    destinations = array("i")
+    for page, degree in enumerate(matrix.in_degrees):
+        destinations.extend([page] * degree)
+    offsets, links = build_csr(n, matrix.sources, destinations)
+
+    if ranks is None:
+        x = [0.0] * n
+        residual = [(1 - d) / n] * n
+    else:
+        x = list(ranks)
+        shares, _ = matrix.shares(x)
+        residual = [
+            (1 - d) / n + d * inflow - rank
+            for inflow, rank in zip(matrix.inflows(shares), x)
+        ]
+
+    active = [page for page in range(n) if abs(residual[page]) > threshold]
+    for _ in range(max_iterations):
+        if not active:
+            break
+        changes = []
+        reached = set()
+        for page in active:
+            amount = residual[page]
+            residual[page] = 0.0
+            x[page] += amount
+            changes.append(amount)
+            degree = out_degrees[page]
+            if degree:
+                share = d * amount / degree
+                targets = links[offsets[page]:offsets[page + 1]]
+                for link in targets:
+                    residual[link] += share
+                reached.update(targets)
+        if trace is not None:
+            trace.append(NORMS[norm](changes))
+        active = [page for page in reached if abs(residual[page]) > threshold]
+    return normalize(x)
+
+
+def personalized_iteration(matrix, damping_factor, teleports,
+                           tolerance=TOLERANCE, max_iterations=MAX_ITERATIONS):
+    """
+    Returns one personalized PageRank vector per teleport vector in
+    `teleports` (each a list in page order summing to 1), solved
+    together by power iteration until every vector moves less than
+    `tolerance` in L1 norm.
+
+    The ranks are kept as one row per page holding a value per teleport
+    vector, so each sweep makes a single pass over the links for all of
+    them. As in transition_model, the surfer on a page with links
+    follows a random link with probability `damping_factor` and
+    otherwise teleports, here to a page drawn from the teleport vector;
+    a page with no links leads to any page with equal probability, so
+    its whole rank is spread evenly rather than teleported.
+    """
+    n = matrix.size
+    k = len(teleports)
+    d = damping_factor
+    zero = (0.0,) * k
+    teleport_rows = list(zip(*teleports))
+    dangling_pages = set(matrix.dangling)
+
+    rows = teleport_rows
+    for _ in range(max_iterations):
+        # Rank each page passes along each link, and rank on pages
+        # with no links, per teleport vector
+        shares = [
+            tuple(rank / degree for rank in row) if degree else zero
+            for row, degree in zip(rows, matrix.out_degrees)
+        ]
+        totals = [0.0] * k
+        dangling = [0.0] * k
+        for page, row in enumerate(rows):
+            for column, rank in enumerate(row):
+                totals[column] += rank
+                if page in dangling_pages:
+                    dangling[column] += rank
+        spread = [total / n for total in dangling]
+
+        # Only rank on pages with links teleports
+        jumping = [(1 - d) * (total - rest) for total, rest in zip(totals, dangling)]
+
+        flow = map(shares.__getitem__, matrix.sources)
+        new_rows = []
+        for teleport, degree in zip(teleport_rows, matrix.in_degrees):
+            incoming = islice(flow, degree)
+            inflows = map(sum, zip(*incoming)) if degree else zero
+            new_rows.append(tuple(
+                jump * weight + s + d * inflow
+                for jump, weight, s, inflow in zip(jumping, teleport, spread, inflows)
+            ))
+
+        changes = [0.0] * k
+        for new_row, row in zip(new_rows, rows):
+            for column in range(k):
+                changes[column] += abs(new_row[column] - row[column])
+        rows = new_rows
+        if max(changes) < tolerance:
+            break
+    return [list(column) for column in zip(*rows)]
+
+
+def normalize(ranks):
+    """
+    Returns `ranks` scaled to sum to 1.
+    """
+    total = sum(ranks)
+    return [rank / total for rank in ranks]
+
+
+# Solvers by name, all taking the same arguments
+SOLVERS = {
+    "jacobi": power_iteration,
+    "gauss_seidel": gauss_seidel,
+    "aitken": aitken,
+    "quadratic": quadratic,
+    "adaptive": adaptive
+}
+
+
+def sweep(matrix, ranks, damping_factor):
+    """
+    Returns the ranks after one step of the random surfer from `ranks`.
+    """
+    n = matrix.size
+    shares, dangling = matrix.shares(ranks)
+
+    # Teleporting and leaving a page with no links both reach every page
+    base = (1 - damping_factor) / n + damping_factor * dangling / n
+    return [
+        base + damping_factor * inflow for inflow in matrix.inflows(shares)
+    ]
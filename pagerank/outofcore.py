@@ -0,0 +1,263 @@
+"""
+Out-of-core PageRank over memory-mapped link arrays.
+
+    python outofcore.py build source output
+    python outofcore.py rank output [top]
+
+`build` converts a corpus directory (parsed with crawl) or a text edge
+list of "source destination" lines into link arrays under `output`:
+
+    pages.txt      one page name per line, in index order
+    offsets.bin    int64 start of each page's incoming links (N + 1)
+    sources.bin    int32 pages linking to each page, grouped by page
+    degrees.bin    int32 number of links out of each page
+
+The edges are first spilled to disk as they are read, then grouped by
+destination with a counting sort that writes into the memory-mapped
+sources file. `rank` maps the arrays and streams the incoming links in
+blocks on every sweep, so only the rank vectors stay in memory and the
+links can be larger than RAM.
+
+Edge lists may repeat a link, which then counts twice; links from a
+page to itself are dropped, as crawl drops them.
+"""
+import heapq
+import mmap
+import os
+import sys
+from array import array
+from itertools import chain, islice
+
+from matrix import MAX_ITERATIONS, TOLERANCE
+from pagerank import crawl
+
+DAMPING = 0.85
+
+# Links read or written at a time
+BLOCK = 1 << 20
+
+PAGES = "pages.txt"
+OFFSETS = "offsets.bin"
+SOURCES = "sources.bin"
+DEGREES = "degrees.bin"
+EDGES = "edges.tmp"
+
+
+def corpus_edges(corpus):
+    """
+    Yields the (source, destination) links of a crawled corpus.
+    """
+    for page, links in corpus.items():
+        for link in links:
+            yield page, link
+
+
+def file_edges(path):
+    """
+    Yields the (source, destination) links of a text edge list,
+    one whitespace-separated pair per line. Blank lines and lines
+    starting with # are skipped.
+    """
+    with open(path) as f:
+        for line in f:
+            fields = line.split()
+            if not fields or fields[0].startswith("#"):
+                continue
+            if len(fields) != 2:
+                raise Exception(f"Invalid edge: {line.strip()}")
+            yield fields[0], fields[1]
+
+
+def build(edges, output, pages=()):
+    """
+    Write the link arrays for `edges` (an iterable of (source,
+    destination) page names) to the directory `output`. `pages` lists
+    pages to include even if they have no links at all.
+    """
+    os.makedirs(output, exist_ok=True)
+    index = {}
+    names = open(os.path.join(output, PAGES), "w")
+
+    def page_index(page):
+        i = index.get(page)
+        if i is None:
+            i = index[page] = len(index)
+            names.write(f"{page}\n")
+        return i
+
+    # Spill the edges to disk as index pairs, counting degrees as we go
+    in_degrees = array("q")
+    out_degrees = array("i")
+    edges_path = os.path.join(output, EDGES)
+    with names, open(edges_path, "wb") as spill:
+        for page in pages:
+            page_index(page)
+        block = array("i")
+        for source, destination in edges:
+            if source == destination:
+                continue
+            block.append(page_index(source))
+            block.append(page_index(destination))
+            if len(block) >= 2 * BLOCK:
+                count_degrees(block, in_degrees, out_degrees, len(index))
+                block.tofile(spill)
+                del block[:]
+        count_degrees(block, in_degrees, out_degrees, len(index))
+        block.tofile(spill)
+    size = len(index)
+    grow(in_degrees, size)
+    grow(out_degrees, size)
+
+    # Each page's incoming links start after those of the pages before it
+    offsets = array("q", [0])
+    for degree in in_degrees:
+        offsets.append(offsets[-1] + degree)
+    del in_degrees
+    with open(os.path.join(output, OFFSETS), "wb") as f:
+        offsets.tofile(f)
+    with open(os.path.join(output, DEGREES), "wb") as f:
+        out_degrees.tofile(f)
+    del out_degrees
+
+    # Counting sort the spilled edges by destination into the sources file
+    links = offsets[-1]
+    sources_path = os.path.join(output, SOURCES)
+    with open(sources_path, "wb") as f:
+        f.truncate(4 * links)
+    if links:
+        cursor = offsets[:-1]
+        del offsets
+        with open(sources_path, "r+b") as f, open(edges_path, "rb") as spill:
+            buffer = mmap.mmap(f.fileno(), 0)
+            sources = memoryview(buffer).cast("i")
+            while True:
+                block = array("i")
+                try:
+                    block.fromfile(spill, 2 * BLOCK)
+                except EOFError:
+                    pass
+                if not block:
+                    break
+                for i in range(0, len(block), 2):
+                    destination = block[i + 1]
+                    sources[cursor[destination]] = block[i]
+                    cursor[destination] += 1
+            sources.release()
+            buffer.close()
+    os.remove(edges_path)
+
+
+def count_degrees(block, in_degrees, out_degrees, size):
+    """
+    Adds the links in a block of (source, destination) index pairs
+    to the degree counts.
+    """
+    grow(in_degrees, size)
+    grow(out_degrees, size)
+    for i in range(0, len(block), 2):
+        out_degrees[block[i]] += 1
+        in_degrees[block[i + 1]] += 1
+
+
+def grow(values, size):
+    """
+    Pads the array `values` with zeros up to `size` items.
+    """
+    if len(values) < size:
+        values.frombytes(bytes(values.itemsize * (size - len(values))))
+
+
+def read_array(path, typecode):
+    """
+    Memory-maps the file at `path` as an array of `typecode` items.
+    """
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return array(typecode)
+        buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    return memoryview(buffer).cast(typecode)
+
+
+def pagerank(output, damping_factor, tolerance=TOLERANCE,
+             max_iterations=MAX_ITERATIONS):
+    """
+    Returns the PageRank vector of the link arrays in `output`, as an
+    array in page order, by power iteration until the ranks move less
+    than `tolerance` in L1 norm.
+    """
+    offsets = read_array(os.path.join(output, OFFSETS), "q")
+    sources = read_array(os.path.join(output, SOURCES), "i")
+    degrees = read_array(os.path.join(output, DEGREES), "i")
+    n = len(degrees)
+    d = damping_factor
+
+    ranks = array("d", [1 / n]) * n
+    for _ in range(max_iterations):
+        # Rank passed along each link, and rank of pages with no links
+        shares = array("d", bytes(8 * n))
+        dangling = 0
+        for page, (rank, degree) in enumerate(zip(ranks, degrees)):
+            if degree:
+                shares[page] = rank / degree
+            else:
+                dangling += rank
+
+        # Stream the incoming links block by block
+        blocks = (
+            map(shares.__getitem__, sources[start:start + BLOCK])
+            for start in range(0, len(sources), BLOCK)
+        )
+        flow = chain.from_iterable(blocks)
+        base = (1 - d) / n + d * dangling / n
+        new_ranks = array("d", (
+            base + d * sum(islice(flow, end - start))
+            for start, end in zip(offsets, offsets[1:])
+        ))
+
+        change = sum(abs(new - old) for new, old in zip(new_ranks, ranks))
+        ranks = new_ranks
+        if change < tolerance:
+            break
+    return ranks
+
+
+def ranked_pages(output, ranks):
+    """
+    Yields (page, rank) pairs for the pages in `output`, in page order,
+    reading their names from disk as it goes.
+    """
+    with open(os.path.join(output, PAGES)) as f:
+        for page, rank in zip(f, ranks):
+            yield page.rstrip("\n"), rank
+
+
+def main():
+    if len(sys.argv) < 3 or sys.argv[1] not in ["build", "rank"]:
+        sys.exit(
+            "Usage: python outofcore.py build source output\n"
+            "       python outofcore.py rank output [top]"
+        )
+
+    if sys.argv[1] == "build":
+        if len(sys.argv) != 4:
+            sys.exit("Usage: python outofcore.py build source output")
+        source, output = sys.argv[2:]
+        if os.path.isdir(source):
+            corpus = crawl(source)
+            build(corpus_edges(corpus), output, pages=corpus)
+        else:
+            build(file_edges(source), output)
+        print(f"Link arrays written to {output}.")
+        return
+
+    output = sys.argv[2]
+    top = int(sys.argv[3]) if len(sys.argv) > 3 else 10
+    ranks = pagerank(output, DAMPING)
+    best = heapq.nlargest(top, ranked_pages(output, ranks), key=lambda pair: pair[1])
+    print("PageRank Results from Out-of-Core Iteration")
+    for page, rank in best:
+        print(f"  {page}: {rank:.4f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,16 @@
 import os
-import random
 import re
 import sys
 
+from crawler import cached_crawl
+from matrix import (
+    NORMS, SOLVERS, TOLERANCE, LinkMatrix, personalized_iteration, power_iteration
+)
+from sampling import Sampler, chain_variance, merge_counts, sample_chains
+
 DAMPING = 0.85
 SAMPLES = 10000
+CHAINS = os.cpu_count() or 1
 
 
 def main():
@@ -21,12 +27,18 @@ def main():
         print(f"  {page}: {ranks[page]:.4f}")
     
 
-def crawl(directory):
+def crawl(directory, cache=False):
     """
     Parse a directory of HTML pages and check for links to other pages.
     Return a dictionary where each key is a page, and values are
     a list of all other pages in the corpus that are linked to by the page.
+
+    With `cache`, pages are parsed in parallel and their links cached
+    next to the corpus, so unchanged pages are not read again.
     """
+    if cache:
+        return cached_crawl(directory)
+
     pages = dict()
 
     # Extract all links from HTML files
@@ -86,56 +98,75 @@ def transition_model(corpus, page, damping_factor):
 
 
 
-def sample_pagerank(corpus, damping_factor, n):
+def sample_pagerank(corpus, damping_factor, n, chains=1):
     """
     Return PageRank values for each page by sampling `n` pages
     according to transition model, starting with a page at random.
+    Each step draws from precomputed link arrays in constant time.
+    With `chains` above 1, the samples are split between that many
+    independent chains run in parallel processes.
 
     Return a dictionary where keys are page names, and values are
     their estimated PageRank value (a value between 0 and 1). All
     PageRank values should sum to 1.
     """
-    
-    pages = list(corpus.keys())
-    page = random.choice(pages) #choose random page to start 
-    
-    samples = [] #markov chain 
-    
-    for i in range(n): #remaining samples choose using transition model 
-        samples.append(page)
-        tm = transition_model(corpus, page, damping_factor)
-        weights = list(tm.values())
-        page = random.choices(pages, weights=weights)[0] #returns a list of 1
-        
-        
-    ranks = {}
-    for page in pages:
-        counter = 0
-        for sample in samples:
-            if sample == page:
-                counter +=1
-        pr = counter/n
-        ranks.update({page:pr})
-        
-    return ranks 
+    if chains > 1:
+        ranks, _ = chain_pagerank(corpus, damping_factor, n, chains)
+        return ranks
+    sampler = Sampler(corpus)
+    return sampler.ranks(sampler.counts(damping_factor, n), n)
+
+
+def chain_pagerank(corpus, damping_factor, n, chains=CHAINS, seed=None):
+    """
+    Return PageRank values for each page by sampling `n` pages split
+    between `chains` independent chains, each in its own process with
+    its own seed, and merging their visit counts.
+
+    Return a (ranks, variances) pair of dictionaries keyed by page: the
+    merged PageRank values, and the variance of each page's estimate
+    between chains. Variances that are large relative to the ranks
+    mean more samples are needed.
+    """
+    sampler = Sampler(corpus)
+    lengths, counts = sample_chains(sampler, damping_factor, n, chains, seed)
+    ranks = sampler.ranks(merge_counts(counts), n)
+    variances = dict(zip(sampler.pages, chain_variance(lengths, counts)))
+    return ranks, variances
 
 
-def iterate_pagerank(corpus, damping_factor):
+def iterate_pagerank(corpus, damping_factor, solver=None, tolerance=0.001,
+                     norm="max", trace=None):
     """
     Return PageRank values for each page by iteratively updating
-    PageRank values until convergence.
+    PageRank values until convergence, that is until the ranks move
+    less than `tolerance` in a sweep, measured by `norm` ("l1", "l2"
+    or "max"). If `trace` is a list, each sweep's change is appended.
+
+    By default every rank is updated from the previous sweep's ranks.
+    A `solver` from matrix.SOLVERS ("jacobi", "gauss_seidel", "aitken",
+    "quadratic" or "adaptive") runs over a sparse link matrix instead.
 
     Return a dictionary where keys are page names, and values are
     their estimated PageRank value (a value between 0 and 1). All
     PageRank values should sum to 1.
     """
-    
+    if norm not in NORMS:
+        raise Exception(f"Unknown norm {norm}")
+    if solver is not None:
+        if solver not in SOLVERS:
+            raise Exception(f"Unknown solver {solver}")
+        matrix = LinkMatrix(corpus)
+        ranks = SOLVERS[solver](
+            matrix, damping_factor, tolerance, norm=norm, trace=trace
+        )
+        return matrix.ranks(ranks)
+
     pages = list(corpus.keys())
     
-    #fix corpus for pages with no outgoing links 
-    for x in corpus:
-        if len(corpus[x]) == 0:
-            corpus[x] = set(pages) #set to link to all pages 
+    #pages with no outgoing links spread their rank over all pages,
+    #without changing the corpus
+    dangling = [x for x in corpus if len(corpus[x]) == 0]
 
     
     ranks = {}
@@ -148,6 +179,13 @@ def iterate_pagerank(corpus, damping_factor):
     while converge==False:
     
         oldranks = ranks.copy()
+
+        #rank on pages with no links, shared by every page
+        danglingrank = 0
+        for x in dangling:
+            danglingrank += oldranks[x]
+        prob3 = damping_factor*danglingrank/len(pages)
+
         for page in pages:
             prob1 = (1-damping_factor)/len(pages) #choosing random page 
             
@@ -164,22 +202,88 @@ def iterate_pagerank(corpus, damping_factor):
                 
             prob2 = damping_factor*sum
             
-            pr = prob1 + prob2
+            pr = prob1 + prob2 + prob3
             ranks[page]=pr #update pageranks 
 
 
         #check if converged 
-        counter = 0
-        for page in pages:
-            difference = abs(oldranks[page] - ranks[page])
-            if difference < 0.001: 
-                counter+=1
-        if counter == len(pages): #all converged
+        change = NORMS[norm]([oldranks[page] - ranks[page] for page in pages])
+        if trace is not None:
+            trace.append(change)
+        if change < tolerance: #all converged
             converge = True
              
     
     return ranks    
 
 
+def matrix_pagerank(corpus, damping_factor, tolerance=TOLERANCE):
+    """
+    Return PageRank values for each page by power iteration over a
+    sparse link matrix built once from `corpus`, until the ranks move
+    less than `tolerance` in total.
+
+    Return a dictionary where keys are page names, and values are
+    their estimated PageRank value (a value between 0 and 1). All
+    PageRank values should sum to 1.
+    """
+    matrix = LinkMatrix(corpus)
+    return matrix.ranks(power_iteration(matrix, damping_factor, tolerance))
+
+
+def personalized_pagerank(corpus, damping_factor, teleport, tolerance=TOLERANCE):
+    """
+    Return personalized PageRank values for one teleport distribution.
+    The random surfer moves as in transition_model, except that with
+    probability `1 - damping_factor` it jumps from a page with links to
+    a page drawn from the teleport distribution instead of from all pages.
+
+    `teleport` is a dictionary mapping pages to weights, or a collection
+    of seed pages that are all equally likely.
+
+    Return a dictionary where keys are page names, and values are
+    their PageRank values (values between 0 and 1). All PageRank values
+    should sum to 1.
+    """
+    return batch_personalized_pagerank(
+        corpus, damping_factor, [teleport], tolerance
+    )[0]
+
+
+def batch_personalized_pagerank(corpus, damping_factor, teleports,
+                                tolerance=TOLERANCE):
+    """
+    Return personalized PageRank values, as in personalized_pagerank,
+    for each teleport distribution in the list `teleports`, solved
+    together in a single power iteration over the corpus.
+
+    Return a list of dictionaries mapping page names to PageRank values,
+    one per teleport distribution, in order.
+    """
+    teleports = list(teleports)
+    if not teleports:
+        return []
+
+    matrix = LinkMatrix(corpus)
+    vectors = []
+    for teleport in teleports:
+        if not isinstance(teleport, dict):
+            teleport = dict.fromkeys(teleport, 1)
+        for page in teleport:
+            if page not in matrix.index:
+                raise Exception(f"Teleport page {page} is not in the corpus")
+        total = sum(teleport.values())
+        if total <= 0:
+            raise Exception("Teleport weights must sum to more than 0")
+        vectors.append([weight / total for weight in matrix.vector(teleport)])
+
+    return [
+        matrix.ranks(vector)
+        for vector in personalized_iteration(
+            matrix, damping_factor, vectors, tolerance
+        )
+    ]
+
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,130 @@
+"""
+Random surfer sampling for PageRank.
+
+A Sampler turns each page's links into a tuple of page indices once, so
+each step of the surfer is a damping coin flip followed by one uniform
+draw, either among the current page's links or among all pages. Every
+link of a page is equally likely, so these uniform draws already are
+the page's transition_model distribution. Visits are tallied as the
+chain runs.
+
+Chains are independent, so several can run at once in a process pool,
+each with its own seed, and their counts summed. How much the chains'
+estimates disagree shows how far the merged estimate is from converged.
+"""
+import multiprocessing
+import os
+import random
+from array import array
+
+# Sampler of a worker process, set by init_worker
+sampler = None
+
+
+class Sampler():
+    """
+    Per-page link arrays of a corpus, for sampling the random surfer.
+    """
+
+    def __init__(self, corpus):
+        self.pages = list(corpus)
+        index = {page: i for i, page in enumerate(self.pages)}
+        self.links = [
+            tuple(index[link] for link in corpus[page] if link in index)
+            for page in self.pages
+        ]
+
+    def counts(self, damping_factor, n, seed=None):
+        """
+        Runs a chain of `n` samples from a random page, returning an
+        array of how many samples landed on each page.
+        """
+        rng = random.Random(seed)
+        size = len(self.pages)
+        links = self.links
+        uniform = rng.random
+        counts = array("q", bytes(8 * size))
+
+        page = rng.randrange(size)
+        for _ in range(n):
+            counts[page] += 1
+            choices = links[page]
+            if choices and uniform() < damping_factor:
+                page = choices[int(uniform() * len(choices))]
+            else:
+                # Teleport, or leave a page with no links
+                page = int(uniform() * size)
+        return counts
+
+    def ranks(self, counts, n):
+        """
+        Returns a dict mapping each page to its share of `n` samples.
+        """
+        return {page: count / n for page, count in zip(self.pages, counts)}
+
+
+def sample_chains(corpus_sampler, damping_factor, n, chains, seed=None):
+    """
+    Runs `chains` independent chains with distinct seeds in a process
+    pool, splitting `n` samples between them.
+
+    Returns the chain lengths and each chain's count array.
+    """
+    # Every chain needs at least one sample
+    chains = max(1, min(chains, n))
+    rng = random.Random(seed)
+    lengths = [n // chains + (i < n % chains) for i in range(chains)]
+    seeds = [rng.getrandbits(64) for _ in range(chains)]
+    workers = min(chains, os.cpu_count() or 1)
+    with multiprocessing.Pool(
+        workers, initializer=init_worker, initargs=(corpus_sampler,)
+    ) as pool:
+        counts = pool.starmap(
+            run_chain,
+            [(damping_factor, length, seed) for length, seed in zip(lengths, seeds)]
+        )
+    return lengths, counts
+
+
+def init_worker(corpus_sampler):
+    """
+    Stores the Sampler in a worker process.
+    """
+    global sampler
+    sampler = corpus_sampler
+
+
+def run_chain(damping_factor, n, seed):
+    """
+    Runs one chain of `n` samples in a worker process.
+    """
+    return sampler.counts(damping_factor, n, seed)
+
+
+def merge_counts(counts):
+    """
+    Returns the element-wise sum of the chains' count arrays.
+    """
+    total = array("q", counts[0])
+    for chain in counts[1:]:
+        for i, count in enumerate(chain):
+            total[i] += count
+    return total
+
+
+def chain_variance(lengths, counts):
+    """
+    Returns, for each page, the sample variance of its estimated rank
+    across the chains (0 if there is only one chain).
+    """
+    chains = len(counts)
+    if chains < 2:
+        return [0.0] * len(counts[0])
+    variances = []
+    for page_counts in zip(*counts):
+        estimates = [count / length for count, length in zip(page_counts, lengths)]
+        mean = sum(estimates) / chains
+        variances.append(
+            sum((estimate - mean) ** 2 for estimate in estimates) / (chains - 1)
+        )
+    return variances